@@ -0,0 +1,25 @@
+"""
+Helpers for the async read endpoints under /api/async/.
+
+DRF views are sync only, so the async variants are plain Django views. They
+build the same data as their DRF counterparts and render it with DRF's
+JSONRenderer, so both paths return identical bodies.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+
+def render_json(data, status=status.HTTP_200_OK):
+    renderer = JSONRenderer()
+    return HttpResponse(renderer.render(data), status=status, content_type=renderer.media_type)
+
+
+async def apaginate(paginator, queryset, request):
+    """
+    ``paginator.paginate_queryset`` for an async view. Returns the fetched
+    page, or None when the client didn't ask for pagination.
+    """
+    return await sync_to_async(paginator.paginate_queryset)(queryset, Request(request))
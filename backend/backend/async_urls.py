@@ -0,0 +1,17 @@
+"""
+Async (ASGI) variants of the read-heavy endpoints, mounted at /api/async/.
+Paths and response bodies mirror their sync counterparts under /api/.
+"""
+from django.urls import path
+
+from books.views import book_issues_async, borrowed_books_async
+from issues.views import overdue_list_async, student_issues_async
+from students.views import students_list_async
+
+urlpatterns = [
+    path('books/borrowed/', borrowed_books_async, name='async-books-borrowed'),
+    path('books/<int:book_id>/history/', book_issues_async, name='async-book-history'),
+    path('issues/<int:student_id>/', student_issues_async, name='async-student-issues'),
+    path('issues/overdue/', overdue_list_async, name='async-overdue-issues'),
+    path('students/', students_list_async, name='async-students'),
+]
@@ -0,0 +1,190 @@
+"""
+Versioned response cache for read endpoints.
+
+Every cached view depends on one or more namespaces ("catalog",
+"circulation"). Each namespace has a version number in the ``versions``
+cache, and writes bump it once their transaction commits. The versions are
+part of both the cache key and the ETag, so a stale entry is never served
+and an unchanged view can answer ``If-None-Match`` with 304 without being
+recomputed.
+
+The version numbers must be visible to every worker and to management
+commands that write, so the ``versions`` cache is file-based by default and
+a per-process LocMemCache is refused. The cached responses themselves live
+in the ``responses`` cache, which may be local to each process.
+"""
+import functools
+import hashlib
+import inspect
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+CATALOG = "catalog"
+CIRCULATION = "circulation"
+
+CACHE_ALIAS = "responses"
+VERSIONS_ALIAS = "versions"
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _versions():
+    cache = caches[VERSIONS_ALIAS]
+    if isinstance(cache, LocMemCache):
+        raise ImproperlyConfigured(
+            f"The {VERSIONS_ALIAS!r} cache must be shared between processes, not a LocMemCache"
+        )
+    return cache
+
+
+def _version_key(namespace):
+    return f"version:{namespace}"
+
+
+def _initial_version():
+    # Seed from the clock so a restarted process never reuses old versions
+    # against a cache that outlived it
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    cache = _versions()
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _initial_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump_now(namespaces):
+    cache = _versions()
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), timeout=None)
+
+
+def bump(*namespaces):
+    """
+    Invalidate cached responses of ``namespaces``. Inside a transaction the
+    versions are bumped right away and again on commit, so a response cached
+    from pre-commit data in between can't outlive the write.
+    """
+    if transaction.get_connection().in_atomic_block:
+        _bump_now(namespaces)
+    transaction.on_commit(lambda: _bump_now(namespaces))
+
+
+def bump_on_change(*namespaces):
+    """post_save/post_delete receiver factory bumping ``namespaces``."""
+    def receiver(sender, **kwargs):
+        bump(*namespaces)
+    return receiver
+
+
+def _find_request(args):
+    for arg in args[:2]:
+        if isinstance(arg, (Request, HttpRequest)):
+            return arg
+    raise TypeError("cached_response needs the request as the first or second argument")
+
+
+def _digest(request, namespaces, time_bucket=None):
+    versions = get_versions(namespaces)
+    path = request.get_full_path()
+    clock = int(time.time() // time_bucket) if time_bucket else ""
+    return hashlib.sha1(f"{path}|{versions}|{clock}".encode()).hexdigest()
+
+
+def _headers(digest):
+    return {"ETag": f'"{digest}"', "Cache-Control": "no-cache"}
+
+
+def _not_modified(request, digest):
+    return f'"{digest}"' in request.headers.get("If-None-Match", "")
+
+
+def cached_response(*namespaces, timeout=3600, time_bucket=None):
+    """
+    Cache successful GET responses of a DRF view under the current versions
+    of ``namespaces`` and answer matching If-None-Match with 304.
+    Works on @api_view functions (apply below @api_view), on view methods and
+    on the plain async views of backend.async_api.
+
+    Views whose output also depends on the clock pass ``time_bucket``
+    (seconds): the key and ETag then change that often as well, so the
+    response is at most that stale with no writes in between.
+    """
+    if time_bucket:
+        timeout = min(timeout, time_bucket)
+
+    def decorator(view):
+        if inspect.iscoroutinefunction(view):
+            return _async_cached(view, namespaces, timeout, time_bucket)
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = _find_request(args)
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            digest = _digest(request, namespaces, time_bucket)
+            headers = _headers(digest)
+            if _not_modified(request, digest):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            cache = _cache()
+            cache_key = f"response:{digest}"
+            data = cache.get(cache_key)
+            if data is None:
+                response = view(*args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                data = response.data
+                cache.set(cache_key, data, timeout)
+            return Response(data, status=status.HTTP_200_OK, headers=headers)
+        return wrapper
+    return decorator
+
+
+def _async_cached(view, namespaces, timeout, time_bucket):
+    # Async views return rendered HttpResponses, so the body bytes are cached
+    # under their own key rather than DRF's response.data
+    @functools.wraps(view)
+    async def wrapper(*args, **kwargs):
+        request = _find_request(args)
+        if request.method != "GET":
+            return await view(*args, **kwargs)
+
+        digest = await sync_to_async(_digest)(request, namespaces, time_bucket)
+        headers = _headers(digest)
+        if _not_modified(request, digest):
+            return HttpResponseNotModified(headers=headers)
+
+        cache = _cache()
+        cache_key = f"response-bytes:{digest}"
+        cached = await cache.aget(cache_key)
+        if cached is None:
+            response = await view(*args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            cached = (response.content, response["Content-Type"])
+            await cache.aset(cache_key, cached, timeout)
+        content, content_type = cached
+        return HttpResponse(content, content_type=content_type, headers=headers)
+    return wrapper
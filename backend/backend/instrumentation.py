@@ -0,0 +1,220 @@
+"""
+Request instrumentation: wall time and DB query count/time per request,
+reported in a Server-Timing header, a log line and an in-process metrics
+registry served at /metrics in Prometheus text format.
+
+Queries are counted by a database execute wrapper that reports to the stats
+of the current request, held in a context variable. asgiref copies the
+context into sync_to_async threads, so queries made by async views through
+the async ORM are counted as well.
+
+The registry lives in the process: with several workers each one exposes
+its own numbers, and Prometheus is expected to scrape every worker.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the usual Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+def _install_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(_install_wrapper, dispatch_uid="instrumentation.record_query")
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            total += count
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Per-route request counters and histograms, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = {}
+            self.latency = {}
+            self.query_counts = {}
+            self.db_time = {}
+
+    def observe(self, method, route, status, duration, stats):
+        key = (method, route)
+        with self._lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self.query_counts.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(stats.queries)
+            self.db_time[key] = self.db_time.get(key, 0.0) + stats.db_time
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += [
+                "# HELP http_requests_total Requests handled, by route and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+            lines += _histogram_lines(
+                "http_request_duration_seconds", "Request wall time, by route.", self.latency
+            )
+            lines += _histogram_lines(
+                "http_request_db_queries", "Database queries per request, by route.", self.query_counts
+            )
+
+            lines += [
+                "# HELP http_request_db_seconds_total Time spent in database queries, by route.",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), seconds in sorted(self.db_time.items()):
+                lines.append(f"http_request_db_seconds_total{_labels(method=method, route=route)} {seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _histogram_lines(name, help_text, histograms):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(histograms.items()):
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {count}")
+        lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum:.6f}")
+        lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+    return lines
+
+
+registry = MetricsRegistry()
+
+
+def _route(request):
+    # The URL pattern, not the path, so ids don't explode label cardinality
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return "/" + match.route
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request, count its queries, add a Server-Timing header, log it
+    and record it in ``registry``. Keep it first in MIDDLEWARE so the timing
+    covers the rest of the stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request = getattr(settings, "SLOW_REQUEST_SECONDS", 1.0)
+        # Connections opened before this module was loaded missed the signal
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(None, connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _start(self):
+        stats = RequestStats()
+        return stats, _current.set(stats), time.perf_counter()
+
+    def _finish(self, request, response, stats, started):
+        # Streaming bodies are produced after this point and aren't included
+        duration = time.perf_counter() - started
+        route = _route(request)
+        registry.observe(request.method, route, response.status_code, duration, stats)
+
+        response["Server-Timing"] = (
+            f'app;dur={duration * 1000:.1f}, '
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"'
+        )
+        level = logging.WARNING if duration >= self.slow_request else logging.DEBUG
+        logger.log(
+            level, "%s %s %s %.1fms %d queries %.1fms db",
+            request.method, request.get_full_path(), response.status_code,
+            duration * 1000, stats.queries, stats.db_time * 1000,
+        )
+        return response
+
+
+def metrics_view(request):
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
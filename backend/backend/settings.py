@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,7 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware',  # must be at the top
+    # First so it times everything below it, CORS included; see backend/instrumentation.py
+    'backend.instrumentation.InstrumentationMiddleware',
+    # Ahead of anything that can return a response, so those carry CORS headers
+    'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,12 +88,126 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# https://docs.djangoproject.com/en/5.2/ref/databases/#sqlite-notes
+#
+# SQLite tuned for several desks lending at once while reports read:
+# - WAL lets readers and the single writer proceed together.
+# - synchronous=NORMAL only syncs at checkpoints, which WAL makes safe
+#   against corruption; a power cut can lose the last commits.
+# - busy_timeout makes a blocked writer wait instead of failing.
+# - BEGIN IMMEDIATE takes the write lock up front. A deferred transaction
+#   that reads, then writes, can't wait for the lock and fails at once
+#   with "database is locked", busy_timeout or not.
+#   Django applies the mode to every atomic() block. That is deliberate:
+#   every atomic() in this project writes, and plain reads run in
+#   autocommit without a transaction, so they never take the lock.
+#   The exception is the admin, which wraps its add/change/delete views
+#   in atomic() even on GET; those hold the write lock for one short
+#   request, which a handful of librarians won't notice.
+# - Connections persist for CONN_MAX_AGE seconds, keeping their page cache
+#   and skipping the reconnect and pragmas on every request.
+# See the benchmark_sqlite_profile command for the effect.
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # milliseconds
+    'cache_size': -64000,           # negative is KiB: 64 MB per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+# Refreshed by the refresh_analytics_snapshot command
+ANALYTICS_SNAPSHOT_PATH = Path(os.environ.get('ANALYTICS_SNAPSHOT_PATH', BASE_DIR / 'analytics.sqlite3'))
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'init_command': '; '.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'CONN_HEALTH_CHECKS': True,
+        # File-backed test database so concurrency tests exercise real SQLite
+        # locking instead of the shared-cache in-memory database.
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    },
+    # Read-only copy of default for reports and exports; see backend/snapshots.py.
+    # immutable=1 skips locking: refreshes swap in a new file, never write this one.
+    'analytics': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f'file:{ANALYTICS_SNAPSHOT_PATH}?mode=ro&immutable=1',
+        'OPTIONS': {
+            'init_command': '; '.join(
+                f'PRAGMA {name}={SQLITE_PRAGMAS[name]}' for name in ('cache_size', 'mmap_size', 'temp_store')
+            ),
+        },
+        # Reconnect per request so a refreshed snapshot is picked up
+        'CONN_MAX_AGE': 0,
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['backend.snapshots.SnapshotRouter']
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# "responses" backs the versioned read-endpoint cache in backend/caching.py.
+# Its entries are keyed by the namespace versions in "versions", which every
+# worker and management command must share, so that one must not be local
+# memory. The entries themselves may stay per-process; to share them too use
+# e.g. RESPONSE_CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# and RESPONSE_CACHE_LOCATION=/var/tmp/library-cache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': os.environ.get('RESPONSE_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RESPONSE_CACHE_LOCATION', 'library-responses'),
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'versions': {
+        'BACKEND': os.environ.get('RESPONSE_VERSIONS_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('RESPONSE_VERSIONS_LOCATION', str(BASE_DIR / 'response-versions')),
+        'TIMEOUT': None,
+    },
+}
+
+
+# Logging and request instrumentation
+# Views log through the standard logging module; the per-request line from
+# backend.instrumentation is DEBUG, or WARNING above SLOW_REQUEST_SECONDS.
+
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 1.0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'plain',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    },
 }
 
 
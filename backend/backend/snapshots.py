@@ -0,0 +1,128 @@
+"""
+Read-only analytics snapshot of the primary database.
+
+refresh() copies the primary into a new file with SQLite's online backup API
+and swaps it in place of ANALYTICS_SNAPSHOT_PATH, which the "analytics"
+database alias opens read-only. Run it periodically with the
+refresh_analytics_snapshot command.
+
+Views decorated with reads_from_snapshot send their queries to that alias
+through SnapshotRouter, so long reports and exports never hold the primary
+while the desks write. Their responses carry X-Snapshot-Age, the age of the
+data in seconds; 0 means the view read the primary because no snapshot has
+been taken yet.
+"""
+import contextvars
+import functools
+import inspect
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from backend import caching
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ALIAS = "analytics"
+AGE_HEADER = "X-Snapshot-Age"
+
+_reading_snapshot = contextvars.ContextVar("reading_snapshot", default=False)
+
+
+def snapshot_path():
+    return Path(settings.ANALYTICS_SNAPSHOT_PATH)
+
+
+def snapshot_age():
+    """Seconds since the current snapshot was taken, or None when there is none."""
+    try:
+        taken_at = snapshot_path().stat().st_mtime
+    except FileNotFoundError:
+        return None
+    return max(time.time() - taken_at, 0.0)
+
+
+def refresh(using=DEFAULT_DB_ALIAS):
+    """Take a new snapshot of ``using`` and swap it in. Returns the time the copy took."""
+    path = snapshot_path()
+    partial = path.with_name(path.name + ".partial")
+    started = time.time()
+
+    connection = connections[using]
+    connection.ensure_connection()
+    target = sqlite3.connect(partial)
+    try:
+        # One step: the copy is a single read transaction, a consistent view
+        # that under WAL doesn't block writers. Stepping would restart the
+        # copy whenever a desk wrote in between.
+        connection.connection.backup(target)
+        # The snapshot is opened read-only and immutable, which rules out WAL
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+
+    # The file's mtime dates the data, not the end of the copy
+    os.utime(partial, (started, started))
+    # Open snapshot connections keep reading the file they opened
+    os.replace(partial, path)
+    # Cached responses were computed from the previous snapshot
+    caching.bump(caching.CATALOG, caching.CIRCULATION)
+    elapsed = time.time() - started
+    logger.info("Analytics snapshot refreshed in %.2fs", elapsed)
+    return elapsed
+
+
+class SnapshotRouter:
+    """Send reads to the analytics snapshot inside reads_from_snapshot views."""
+
+    def db_for_read(self, model, **hints):
+        if _reading_snapshot.get():
+            return ANALYTICS_ALIAS
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # The snapshot is a copy of the primary, migrated with it
+        if db == ANALYTICS_ALIAS:
+            return False
+        return None
+
+
+def _age_header(age):
+    return str(int(age)) if age is not None else "0"
+
+
+def reads_from_snapshot(view):
+    """
+    Run ``view``'s reads against the analytics snapshot when one exists and
+    add X-Snapshot-Age to its response. Apply below @api_view and above
+    cached_response.
+    """
+    if inspect.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            age = snapshot_age()
+            token = _reading_snapshot.set(age is not None)
+            try:
+                response = await view(*args, **kwargs)
+            finally:
+                _reading_snapshot.reset(token)
+            response[AGE_HEADER] = _age_header(age)
+            return response
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        age = snapshot_age()
+        token = _reading_snapshot.set(age is not None)
+        try:
+            response = view(*args, **kwargs)
+        finally:
+            _reading_snapshot.reset(token)
+        response[AGE_HEADER] = _age_header(age)
+        return response
+    return wrapper
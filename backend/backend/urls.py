@@ -17,9 +17,13 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from backend.instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('books.urls')), 
     path('api/students/', include('students.urls')), 
     path('api/issues/', include('issues.urls')),
+    path('api/async/', include('backend.async_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
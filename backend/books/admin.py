@@ -1,4 +1,5 @@
 from django.contrib import admin
+from backend.pagination import EstimatedCountPaginator
 from .models import Books, Publisher
 
 
@@ -12,9 +13,13 @@ class PublisherAdmin(admin.ModelAdmin):
 class BooksAdmin(admin.ModelAdmin):
     list_display = (
         "book_no", "title", "author", "publisher", "quantity", 
-        "price", "published_year", "date_of_issue"
+        "available_count", "price", "published_year", "date_of_issue"
     )
     list_filter = ("publisher", "published_year", "date_of_issue")
     search_fields = ("book_no", "title", "author", "bill_no", "catelog_no")
     ordering = ("title",)
-    autocomplete_fields = ("publisher",) 
\ No newline at end of file
+    readonly_fields = ("available_count",)
+    autocomplete_fields = ("publisher",)
+    list_select_related = ("publisher",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False 
\ No newline at end of file
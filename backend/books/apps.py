@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+
+def ensure_search_index(sender, using, **kwargs):
+    # SQLite table rebuilds in later migrations drop the FTS triggers
+    from books import search
+    search.install(connections[using])
 
 
 class BooksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'books'
+
+    def ready(self):
+        from backend.caching import CATALOG, bump_on_change
+        post_migrate.connect(ensure_search_index, sender=self)
+
+        invalidate_catalog = bump_on_change(CATALOG)
+        for model in ('Books', 'Publisher'):
+            post_save.connect(invalidate_catalog, sender=self.get_model(model), weak=False)
+            post_delete.connect(invalidate_catalog, sender=self.get_model(model), weak=False)
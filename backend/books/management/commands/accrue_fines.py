@@ -0,0 +1,28 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from issues import fines
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly job: price overdue loans into the fines ledger and refresh "
+        "the students' fine balances, in set-based SQL (see issues/fines.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=date.fromisoformat, default=None,
+            help="Accrue as of this YYYY-MM-DD date (default: today).",
+        )
+        parser.add_argument(
+            "--since", type=date.fromisoformat, default=None,
+            help="Re-price loans returned from this date on (default: the previous run).",
+        )
+
+    def handle(self, *args, **options):
+        written, refreshed = fines.accrue(options["date"], options["since"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} ledger rows written, {refreshed} student balances refreshed"
+        ))
@@ -0,0 +1,122 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Q
+from django.test import AsyncClient, Client
+
+from books.models import Books
+from students.models import Students
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the DRF read endpoints (WSGI handler, one thread per request) "
+        "with their /api/async/ variants (ASGI handler, one event loop) against "
+        "the configured database. --client-delay models slow clients: a WSGI "
+        "worker thread stays busy while its client reads, the event loop doesn't."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Clients sending requests at once.")
+        parser.add_argument(
+            "--wsgi-threads", type=int, default=None,
+            help="Worker threads serving WSGI requests (default: one per client).",
+        )
+        parser.add_argument(
+            "--client-delay", type=float, default=0,
+            help="Milliseconds each client takes to receive a response.",
+        )
+        parser.add_argument(
+            "--cached", action="store_true",
+            help="Let cached endpoints answer from the response cache (default: bypass it).",
+        )
+
+    def endpoints(self):
+        student = (
+            Students.objects
+            .annotate(open_issues=Count('issues', filter=Q(issues__return_date__isnull=True)))
+            .order_by('-open_issues').first()
+        )
+        book = Books.objects.annotate(loans=Count('issues')).order_by('-loans').first()
+        if student is None or book is None:
+            raise CommandError("Needs at least one student and one book; load some data first.")
+        return [
+            f"/issues/{student.id}/",
+            "/issues/overdue/?page_size=100",
+            f"/books/{book.id}/history/?page_size=100",
+            "/books/borrowed/?page_size=100",
+            "/students/?page_size=100",
+        ]
+
+    def url(self, prefix, path, i, cached):
+        url = prefix + path
+        if cached:
+            return url
+        # A distinct query string per request misses the response cache
+        return f"{url}{'&' if '?' in url else '?'}_={i}"
+
+    def run_wsgi(self, path, total, concurrency, cached, threads, delay):
+        client = Client()
+        workers = threading.Semaphore(threads)
+
+        def fetch(i):
+            started = time.perf_counter()
+            with workers:
+                response = client.get(self.url("/api", path, i, cached))
+                assert response.status_code == 200, response.status_code
+                time.sleep(delay)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = list(pool.map(fetch, range(total)))
+        return _summary(latencies, time.perf_counter() - started)
+
+    async def run_asgi(self, path, total, concurrency, cached, delay):
+        client = AsyncClient()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def fetch(i):
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(self.url("/api/async", path, i, cached))
+                assert response.status_code == 200, response.status_code
+                await asyncio.sleep(delay)
+                return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(fetch(i) for i in range(total)))
+        return _summary(latencies, time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        total, concurrency, cached = options["requests"], options["concurrency"], options["cached"]
+        threads = options["wsgi_threads"] or concurrency
+        delay = options["client_delay"] / 1000
+        self.stdout.write(
+            f"{total} requests per endpoint, {concurrency} clients, "
+            f"{threads} WSGI threads, {options['client_delay']:g} ms client delay"
+        )
+        self.stdout.write(f"{'endpoint':45} {'mode':5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for path in self.endpoints():
+            results = {
+                "wsgi": self.run_wsgi(path, total, concurrency, cached, threads, delay),
+                "asgi": asyncio.run(self.run_asgi(path, total, concurrency, cached, delay)),
+            }
+            for mode, result in results.items():
+                self.stdout.write(
+                    f"{path:45} {mode:5} {result['rps']:8.1f} {result['p50']:8.1f} {result['p95']:8.1f}"
+                )
@@ -0,0 +1,228 @@
+import contextlib
+import json
+import statistics
+import time
+from datetime import timedelta
+from importlib import import_module
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+
+from books.models import Books
+from issues.models import issues
+from students.models import Students
+
+URLCONFS = ("books.urls", "students.urls", "issues.urls")
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+# Regressions smaller than this are noise at the scale of a single request
+SLACK_MS = 5.0
+BATCH_SIZE = 30
+
+
+class Scenario:
+    """One timed request against a named route. Writes are rolled back after each run."""
+
+    def __init__(self, route, method="get", kwargs=None, query="", body=None):
+        self.route = route
+        self.method = method
+        self.kwargs = kwargs or (lambda samples: {})
+        self.query = query
+        self.body = body
+
+    @property
+    def key(self):
+        label = f"{self.method.upper()} {self.route}"
+        return f"{label}?{self.query}" if self.query else label
+
+    @property
+    def writes(self):
+        return self.method != "get"
+
+
+SCENARIOS = [
+    Scenario("api-root"),
+    Scenario("books-list", query="page_size=100"),
+    Scenario("books-list", query="page_size=100&fields=id,title,author,available_quantity"),
+    Scenario("books-list", "post", body=lambda s: {"book_no": "BENCH-1", "title": "Benchmark", "total_quantity": 2, "publisher_id": s["publisher"]}),
+    Scenario("books-detail", kwargs=lambda s: {"pk": s["book"]}),
+    Scenario("books-detail", "patch", kwargs=lambda s: {"pk": s["book"]}, body=lambda s: {"total_quantity": s["book_quantity"] + 1}),
+    Scenario("books-get-borrowed", query="page_size=100"),
+    Scenario("books-search-books", query="q=intro+thermo"),
+    Scenario("book-history", kwargs=lambda s: {"book_id": s["book"]}, query="page_size=100"),
+    Scenario("students", query="page_size=100"),
+    Scenario("student_issues", kwargs=lambda s: {"student_id": s["borrower"]}),
+    Scenario("lend_eligibility", kwargs=lambda s: {"student_id": s["idle_student"], "book_id": s["available_book"]}),
+    Scenario("lend_book", "post", kwargs=lambda s: {"student_id": s["idle_student"], "book_id": s["available_book"]}),
+    Scenario("return_book", "post", kwargs=lambda s: {"student_id": s["borrower"], "book_id": s["borrowed_book"]}),
+    Scenario("renew_book", "post", kwargs=lambda s: {"student_id": s["borrower"], "book_id": s["borrowed_book"]}),
+    Scenario("batch_lend", "post", body=lambda s: s["batch_lend"]),
+    Scenario("batch_return", "post", body=lambda s: s["batch_return"]),
+    Scenario("overdue_issues", query="page_size=100"),
+    Scenario("all_issues", query="start={recent}"),
+    Scenario("export_issues_csv", query="book={book}&start={recent}"),
+    Scenario("export_issues_ndjson", query="book={book}&start={recent}"),
+]
+
+
+def route_names():
+    """Named routes of the benchmarked urlconfs, format-suffix duplicates collapsed."""
+    names = set()
+
+    def walk(patterns):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                names.add(pattern.name)
+
+    for urlconf in URLCONFS:
+        walk(import_module(urlconf).urlpatterns)
+    return names
+
+
+def pick_samples():
+    """Representative ids from the current data; the busiest rows where it matters."""
+    busiest_book = (
+        issues.objects.values('book').annotate(n=Count('id')).order_by('-n').values_list('book', flat=True).first()
+    )
+    book = Books.objects.filter(pk=busiest_book).first() or Books.objects.order_by('id').first()
+    open_issue = issues.objects.filter(return_date__isnull=True).select_related('book').order_by('-id').first()
+    idle_students = list(
+        Students.objects.annotate(open=Count('issues', filter=Q(issues__return_date__isnull=True)))
+        .filter(open=0).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+    )
+    textbook = Books.objects.filter(available_count__gte=1).order_by('-available_count').first()
+    open_pairs = list(
+        issues.objects.filter(return_date__isnull=True).order_by('id')
+        .values_list('student_id', 'book_id')[:BATCH_SIZE]
+    )
+    if not (book and open_issue and idle_students and textbook):
+        raise CommandError("Needs books, students and open issues; run seed_library first.")
+    return {
+        "book": book.id,
+        "book_quantity": book.quantity or 0,
+        "publisher": book.publisher_id,
+        "borrower": open_issue.student_id,
+        "borrowed_book": open_issue.book_id,
+        "idle_student": idle_students[0],
+        "available_book": textbook.id,
+        "batch_lend": [{"student_id": s, "book_id": textbook.id} for s in idle_students],
+        "batch_return": [{"student_id": s, "book_id": b} for s, b in open_pairs],
+        "recent": (timezone.localdate() - timedelta(days=30)).isoformat(),
+    }
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[max(int(round(len(values) * fraction)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every route of books.urls, students.urls and issues.urls against "
+        "the configured database (see seed_library), reporting p50/p95 latency "
+        "and query counts. Fails when a route is slower than the stored "
+        "baseline allows, runs more queries, or has no scenario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline.")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.5,
+            help="Allowed p95 slowdown over the baseline, as a fraction (default 0.5).",
+        )
+
+    def handle(self, *args, **options):
+        uncovered = route_names() - {scenario.route for scenario in SCENARIOS}
+        samples = pick_samples()
+        client = Client()
+
+        results = {}
+        self.stdout.write(f"{'scenario':60} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8}")
+        for scenario in SCENARIOS:
+            results[scenario.key] = result = self.run(client, scenario, samples, options["requests"])
+            self.stdout.write(
+                f"{scenario.key:60} {result['p50_ms']:8.1f} {result['p95_ms']:8.1f} {result['queries']:8d}"
+            )
+
+        run = {"dataset": self.dataset(), "results": results}
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(run, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+        elif baseline_path.exists():
+            failures = self.compare(json.loads(baseline_path.read_text()), run, options["tolerance"])
+            failures += [f"{name}: route has no benchmark scenario" for name in sorted(uncovered)]
+            if failures:
+                for failure in failures:
+                    self.stderr.write(failure)
+                raise CommandError(f"{len(failures)} benchmark regression(s) against {baseline_path}")
+            self.stdout.write(self.style.SUCCESS(f"Within baseline {baseline_path}"))
+        else:
+            self.stdout.write(f"No baseline at {baseline_path}; pass --save-baseline to record one")
+
+    def run(self, client, scenario, samples, count):
+        path = reverse(scenario.route, kwargs=scenario.kwargs(samples))
+        query = scenario.query.format(**samples)
+        body = scenario.body(samples) if scenario.body else None
+        call = getattr(client, scenario.method)
+
+        timings, queries = [], 0
+        # One untimed warm-up request, then ``count`` timed ones
+        for i in range(count + 1):
+            # A distinct query string per request misses the response cache
+            url = f"{path}?{query}&_bench={i}" if query else f"{path}?_bench={i}"
+            rollback = transaction.atomic() if scenario.writes else contextlib.nullcontext()
+            with rollback, CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = call(url, data=body, content_type="application/json") if body is not None else call(url)
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                elapsed = time.perf_counter() - started
+                if scenario.writes:
+                    transaction.set_rollback(True)
+            if response.status_code >= 400:
+                raise CommandError(f"{scenario.key} answered {response.status_code}")
+            if i:
+                timings.append(elapsed * 1000)
+                queries = max(queries, len(captured))
+        return {
+            "path": path,
+            "p50_ms": round(statistics.median(timings), 2),
+            "p95_ms": round(percentile(timings, 0.95), 2),
+            "queries": queries,
+        }
+
+    def dataset(self):
+        return {
+            "books": Books.objects.count(),
+            "students": Students.objects.count(),
+            "issues": issues.objects.count(),
+        }
+
+    def compare(self, baseline, run, tolerance):
+        if baseline.get("dataset") != run["dataset"]:
+            self.stdout.write(self.style.WARNING(
+                f"Dataset differs from the baseline's ({baseline.get('dataset')}); timings may not compare"
+            ))
+        failures = []
+        for key, result in run["results"].items():
+            expected = baseline["results"].get(key)
+            if expected is None:
+                continue
+            allowed = expected["p95_ms"] * (1 + tolerance) + SLACK_MS
+            if result["p95_ms"] > allowed:
+                failures.append(f"{key}: p95 {result['p95_ms']:.1f}ms, baseline {expected['p95_ms']:.1f}ms")
+            if result["queries"] > expected["queries"]:
+                failures.append(f"{key}: {result['queries']} queries, baseline {expected['queries']}")
+        return failures
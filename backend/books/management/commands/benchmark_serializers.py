@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from books.models import Books
+from books.serializers import BookRows, BooksSerializer
+from students.models import Students
+from students.serializers import StudentRows, student_serializer
+
+
+def _drf(serializer_class, queryset):
+    return lambda: serializer_class(queryset.all(), many=True).data
+
+
+def _rows(row_serializer_class, queryset):
+    def serialize():
+        rows = row_serializer_class()
+        return rows.serialize(rows.values(queryset.all()))
+    return serialize
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the DRF serializers of the hot list endpoints with their "
+        ".values() fast paths (backend/fast_serializers.py) on the configured "
+        "database: rows/sec of query + serialize, best of --repeat runs. "
+        "Fails if the rendered JSON of the two differs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Rows per list.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per serializer; the best is reported.")
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], max(options["repeat"], 1)
+        books = Books.objects.with_circulation().order_by('id')[:rows]
+        students = Students.objects.with_loan_stats().order_by('id')[:rows]
+        cases = [
+            ("books", _drf(BooksSerializer, books), _rows(BookRows, books)),
+            ("students", _drf(student_serializer, students), _rows(StudentRows, students)),
+        ]
+
+        renderer = JSONRenderer()
+        self.stdout.write(f"{'list':<10} {'rows':>7} {'DRF rows/s':>12} {'fast rows/s':>12} {'speedup':>8}")
+        for name, drf, fast in cases:
+            timings = []
+            for serialize in (drf, fast):
+                best = None
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    data = serialize()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append((best, renderer.render(data)))
+
+            (drf_time, drf_body), (fast_time, fast_body) = timings
+            if drf_body != fast_body:
+                raise CommandError(f"{name}: the fast path's output differs from the DRF serializer's")
+            count = len(data)
+            self.stdout.write(
+                f"{name:<10} {count:>7} {count / drf_time:>12,.0f} {count / fast_time:>12,.0f} "
+                f"{drf_time / fast_time:>7.1f}x"
+            )
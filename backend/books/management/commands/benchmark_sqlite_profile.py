@@ -0,0 +1,146 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from books.models import Books
+from students.models import Students
+
+# Django's defaults. journal_mode persists in the database file, so the
+# stock run has to switch a WAL database back explicitly.
+STOCK_PROFILE = {"OPTIONS": {"init_command": "PRAGMA journal_mode=DELETE"}, "CONN_MAX_AGE": 0}
+
+
+def _p95(latencies):
+    latencies = sorted(latencies)
+    return latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000 if latencies else 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a mixed workload against the configured SQLite database twice, "
+        "with Django's stock SQLite settings and with the profile from "
+        "settings.DATABASES: writer threads lend and return books while "
+        "reader threads fetch issue lists, book history and a report. "
+        "Reports throughput, p95 latency and failed requests per profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=10, help="Duration of each run.")
+        parser.add_argument("--writers", type=int, default=8, help="Threads lending and returning.")
+        parser.add_argument("--readers", type=int, default=8, help="Threads reading.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The profiles compared here are SQLite settings.")
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        configured = {"OPTIONS": settings_dict["OPTIONS"], "CONN_MAX_AGE": settings_dict["CONN_MAX_AGE"]}
+        pairs, read_urls = self.workload(options["writers"])
+
+        self.stdout.write(
+            f"{options['writers']} writers, {options['readers']} readers, {options['seconds']:g}s per profile"
+        )
+        self.stdout.write(
+            f"{'profile':10} {'writes/s':>9} {'reads/s':>9} {'write p95':>10} {'read p95':>9} {'failed':>7}"
+        )
+        results = {}
+        try:
+            for name, profile in (("stock", STOCK_PROFILE), ("configured", configured)):
+                self.use_profile(profile)
+                results[name] = result = self.run(pairs, read_urls, options)
+                self.stdout.write(
+                    f"{name:10} {result['writes']:9.1f} {result['reads']:9.1f} "
+                    f"{result['write_p95']:8.1f}ms {result['read_p95']:7.1f}ms {result['failed']:7d}"
+                )
+        finally:
+            self.use_profile(configured)
+
+        stock, tuned = results["stock"], results["configured"]
+        if stock["writes"] and stock["reads"]:
+            self.stdout.write(
+                f"Throughput: writes x{tuned['writes'] / stock['writes']:.1f}, "
+                f"reads x{tuned['reads'] / stock['reads']:.1f}"
+            )
+
+    def workload(self, writers):
+        """One (student, book) pair per writer, lent and returned in a loop, and the read URLs."""
+        students = list(
+            Students.objects.annotate(open=Count('issues', filter=Q(issues__return_date__isnull=True)))
+            .filter(open=0).order_by('id').values_list('id', flat=True)[:writers]
+        )
+        books = list(
+            Books.objects.filter(available_count__gte=1).order_by('-available_count')
+            .values_list('id', flat=True)[:writers]
+        )
+        if len(students) < writers or len(books) < writers:
+            raise CommandError("Needs a student without loans and an available book per writer; run seed_library first.")
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        read_urls = [
+            reverse("student_issues", kwargs={"student_id": students[0]}),
+            reverse("book-history", kwargs={"book_id": books[0]}) + "?page_size=100",
+            reverse("overdue_issues") + "?page_size=100",
+            reverse("all_issues") + f"?start={yesterday}&end={yesterday}",
+        ]
+        return list(zip(students, books)), read_urls
+
+    def use_profile(self, profile):
+        # Connections read their settings when they connect
+        connections.close_all()
+        connections.settings[DEFAULT_DB_ALIAS].update(profile)
+
+    def run(self, pairs, read_urls, options):
+        deadline = time.perf_counter() + options["seconds"]
+        write_latencies, read_latencies, failed = [], [], []
+
+        def timed(client, method, url, latencies):
+            started = time.perf_counter()
+            response = getattr(client, method)(url)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 500:
+                failed.append(url)
+
+        def writer(student_id, book_id):
+            client = Client(raise_request_exception=False)
+            lend = reverse("lend_book", kwargs={"student_id": student_id, "book_id": book_id})
+            give_back = reverse("return_book", kwargs={"student_id": student_id, "book_id": book_id})
+            try:
+                while time.perf_counter() < deadline:
+                    timed(client, "post", lend, write_latencies)
+                    timed(client, "post", give_back, write_latencies)
+            finally:
+                connection.close()
+
+        def reader(offset):
+            client = Client(raise_request_exception=False)
+            i = offset
+            try:
+                while time.perf_counter() < deadline:
+                    url = read_urls[i % len(read_urls)]
+                    # A distinct query string per request misses the response cache
+                    timed(client, "get", f"{url}{'&' if '?' in url else '?'}_bench={i}", read_latencies)
+                    i += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=writer, args=pair) for pair in pairs]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(options["readers"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "writes": len(write_latencies) / elapsed,
+            "reads": len(read_latencies) / elapsed,
+            "write_p95": _p95(write_latencies),
+            "read_p95": _p95(read_latencies),
+            "failed": len(failed),
+        }
@@ -0,0 +1,239 @@
+import csv
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from backend import caching
+from books.models import Books, Publisher
+
+UPLOAD_DIR = Path(__file__).resolve().parents[2] / "upload"
+
+# Columns copied onto Books as-is (after stripping)
+TEXT_FIELDS = ("title", "author", "vol", "bill_no", "catelog_no", "remarks")
+UPDATE_FIELDS = TEXT_FIELDS + ("date_of_issue", "published_year", "quantity", "price", "publisher")
+BOOK_FIELDS = [Books._meta.get_field(name) for name in UPDATE_FIELDS]
+QUANTITY = UPDATE_FIELDS.index("quantity")
+
+
+class RowError(ValueError):
+    pass
+
+
+def parse_date(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"invalid date {value!r}")
+
+
+def parse_int(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"invalid quantity {value!r}")
+
+
+def parse_price(value):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return Decimal(value).quantize(Decimal("0.01"))
+    except InvalidOperation:
+        raise RowError(f"invalid price {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk import publishers and books from CSV. Books are upserted by book_no "
+        "in batches; rejected rows are written to a side file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "books_csv", nargs="?", default=str(UPLOAD_DIR / "books.csv"),
+            help="Books CSV (default: books/upload/books.csv)",
+        )
+        parser.add_argument(
+            "--publishers", default=None,
+            help="Publishers CSV (name,address,contact) imported first "
+                 "(default: publishers.csv next to the books CSV, if present).",
+        )
+        parser.add_argument(
+            "--no-publishers", action="store_true",
+            help="Don't import a publishers CSV.",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--rejects", default=None,
+            help="Where to write rejected rows (default: <books_csv>.rejects.csv)",
+        )
+
+    def handle(self, *args, **options):
+        books_csv = Path(options["books_csv"])
+        if not books_csv.exists():
+            raise CommandError(f"{books_csv} does not exist")
+        rejects_path = Path(options["rejects"] or f"{books_csv}.rejects.csv")
+        self.batch_size = options["batch_size"]
+
+        # Publisher name -> id, kept in memory for the whole import
+        self.publisher_ids = {
+            name: pk for pk, name in Publisher.objects.exclude(name=None).values_list("id", "name")
+        }
+        if not options["no_publishers"]:
+            publishers_csv = Path(options["publishers"] or books_csv.parent / "publishers.csv")
+            if options["publishers"] or publishers_csv.exists():
+                self.import_publishers(publishers_csv)
+
+        started = time.perf_counter()
+        stats = {"rows": 0, "created": 0, "updated": 0, "unchanged": 0, "rejected": 0}
+
+        with open(books_csv, newline="", encoding="utf-8") as source, \
+                open(rejects_path, "w", newline="", encoding="utf-8") as rejects_file:
+            reader = csv.DictReader(source)
+            rejects = csv.writer(rejects_file)
+            rejects.writerow(["line", "reason"] + list(reader.fieldnames or []))
+
+            batch = {}
+            for row in reader:
+                stats["rows"] += 1
+                try:
+                    book_no, values = self.parse_row(row)
+                except RowError as error:
+                    stats["rejected"] += 1
+                    rejects.writerow([reader.line_num, str(error)] + [row.get(f) for f in reader.fieldnames])
+                    continue
+                # A book_no repeated within a batch: the last row wins
+                batch[book_no] = values
+                if len(batch) >= self.batch_size:
+                    self.flush(batch, stats)
+                    batch = {}
+            if batch:
+                self.flush(batch, stats)
+
+        elapsed = time.perf_counter() - started
+        rate = stats["rows"] / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['rows']} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec): "
+            f"{stats['created']} created, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['rejected']} rejected"
+        ))
+        if stats["rejected"]:
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
+        else:
+            rejects_path.unlink()
+
+    def import_publishers(self, path):
+        with open(path, newline="", encoding="utf-8") as source:
+            new = {}
+            for row in csv.DictReader(source):
+                name = (row.get("name") or "").strip()
+                if name and name not in self.publisher_ids and name not in new:
+                    new[name] = Publisher(
+                        name=name,
+                        address=row.get("address", ""),
+                        contact=row.get("contact", ""),
+                    )
+        for publisher in Publisher.objects.bulk_create(new.values(), batch_size=self.batch_size):
+            self.publisher_ids[publisher.name] = publisher.pk
+        self.stdout.write(f"Added {len(new)} publishers")
+
+    def parse_row(self, row):
+        book_no = (row.get("book_no") or "").strip()
+        if not book_no:
+            raise RowError("missing book_no")
+
+        values = {field: (row.get(field) or "").strip() for field in TEXT_FIELDS}
+        values["date_of_issue"] = parse_date(row.get("date_of_issue"))
+        values["published_year"] = parse_date(row.get("published_year"))
+        values["quantity"] = parse_int(row.get("quantity"))
+        values["price"] = parse_price(row.get("price"))
+        values["publisher_name"] = (row.get("publisher") or "").strip() or None
+        return book_no, values
+
+    def resolve_publishers(self, batch):
+        missing = {
+            values["publisher_name"] for values in batch.values()
+            if values["publisher_name"] and values["publisher_name"] not in self.publisher_ids
+        }
+        if missing:
+            created = Publisher.objects.bulk_create([Publisher(name=name) for name in missing])
+            for publisher in created:
+                self.publisher_ids[publisher.name] = publisher.pk
+
+    def flush(self, batch, stats):
+        with transaction.atomic():
+            self.resolve_publishers(batch)
+            existing = {
+                row[1]: row for row in Books.objects
+                .filter(book_no__in=list(batch))
+                .values_list("id", "book_no", *(f.attname for f in BOOK_FIELDS))
+            }
+
+            to_create, to_update = [], []
+            for book_no, values in batch.items():
+                values["publisher"] = self.publisher_ids.get(values.pop("publisher_name"))
+                row = tuple(values[name] for name in UPDATE_FIELDS)
+                if book_no not in existing:
+                    to_create.append((book_no, row))
+                elif row != existing[book_no][2:]:
+                    to_update.append((existing[book_no], row))
+
+            self.insert_books(to_create)
+            self.update_books(to_update)
+            if to_create or to_update:
+                caching.bump(caching.CATALOG)
+
+        stats["created"] += len(to_create)
+        stats["updated"] += len(to_update)
+        stats["unchanged"] += len(batch) - len(to_create) - len(to_update)
+
+    # Rows are written with executemany rather than bulk_create/bulk_update:
+    # building a model instance per row dominates the import time, and
+    # bulk_update's per-row CASE expressions are quadratic on large batches.
+
+    def prepare(self, row):
+        # Resolve the connection proxy once; it's a thread-local lookup per access
+        db = connections[DEFAULT_DB_ALIAS]
+        return [f.get_db_prep_save(value, db) for f, value in zip(BOOK_FIELDS, row)]
+
+    def insert_books(self, rows):
+        if not rows:
+            return
+        columns = ["book_no"] + [f.column for f in BOOK_FIELDS] + ["available_count"]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            connection.ops.quote_name(Books._meta.db_table),
+            ", ".join(connection.ops.quote_name(c) for c in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        # Books.save() isn't called, so seed the availability counter here
+        params = [[book_no] + self.prepare(row) + [row[QUANTITY] or 0] for book_no, row in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def update_books(self, rows):
+        if not rows:
+            return
+        available = connection.ops.quote_name("available_count")
+        sql = "UPDATE {} SET {}, {} = {} + %s WHERE id = %s".format(
+            connection.ops.quote_name(Books._meta.db_table),
+            ", ".join(f"{connection.ops.quote_name(f.column)} = %s" for f in BOOK_FIELDS),
+            available, available,
+        )
+        params = []
+        for current, row in rows:
+            # Shift availability by the quantity delta so open loans stay counted
+            delta = (row[QUANTITY] or 0) - (current[2 + QUANTITY] or 0)
+            params.append(self.prepare(row) + [delta, current[0]])
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from backend import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the primary database to the read-only analytics snapshot that "
+        "reports and exports read from (see backend/snapshots.py). Runs once, "
+        "or every --every seconds until interrupted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=float, default=None,
+            help="Keep running, refreshing every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Snapshots use SQLite's backup API; the primary must be SQLite.")
+        while True:
+            elapsed = snapshots.refresh()
+            self.stdout.write(f"Snapshot written to {snapshots.snapshot_path()} in {elapsed:.2f}s")
+            if options["every"] is None:
+                return
+            time.sleep(max(options["every"] - elapsed, 0))
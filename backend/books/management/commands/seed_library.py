@@ -0,0 +1,225 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.utils import timezone
+
+from backend import caching
+from books.models import Books, Publisher
+from issues.models import Fine, issues, OVERDUE_DAYS_LIMIT
+from students.models import Students
+
+DEPARTMENTS = ("CS", "IA", "EC", "ME", "CE", "EE")
+FIRST_NAMES = (
+    "Aarav", "Aditi", "Arjun", "Asha", "Dev", "Divya", "Farhan", "Ishaan", "Kavya", "Meera",
+    "Nikhil", "Pooja", "Rahul", "Ravi", "Riya", "Rohan", "Sana", "Sneha", "Tanvi", "Vikram",
+)
+LAST_NAMES = (
+    "Patel", "Sharma", "Iyer", "Reddy", "Khan", "Nair", "Gupta", "Das", "Joshi", "Menon",
+    "Singh", "Rao", "Kulkarni", "Bose", "Mehta", "Pillai", "Verma", "Shah", "Chopra", "Ghosh",
+)
+TITLE_LEADS = (
+    "Introduction to", "Principles of", "Advanced", "Applied", "Fundamentals of",
+    "Handbook of", "Elements of", "Modern", "Essentials of", "Topics in",
+)
+SUBJECTS = (
+    "Thermodynamics", "Digital Electronics", "Data Structures", "Fluid Mechanics",
+    "Control Systems", "Signals and Systems", "Operating Systems", "Machine Design",
+    "Power Systems", "Structural Analysis", "Linear Algebra", "Compiler Design",
+    "Engineering Mathematics", "Computer Networks", "Heat Transfer", "Microprocessors",
+    "Soil Mechanics", "Database Systems", "Electromagnetics", "Strength of Materials",
+)
+# Copies per title: most books have a few, course textbooks many
+QUANTITIES = (1, 2, 3, 5, 10, 30)
+QUANTITY_WEIGHTS = (30, 25, 20, 12, 9, 4)
+# Open loans per student right now
+OPEN_LOANS = (0, 1, 2, 3, 4, 5)
+OPEN_LOAN_WEIGHTS = (50, 25, 13, 7, 3, 2)
+# Relative borrowing by weekday, Monday first
+WEEKDAY_WEIGHTS = (1.0, 1.0, 1.0, 1.0, 0.9, 0.3, 0.1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic library (publishers, books, students and issue "
+        "history) in bulk for load testing and benchmarks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=100_000)
+        parser.add_argument("--students", type=int, default=20_000)
+        parser.add_argument("--issues", type=int, default=3_000_000, help="Total issues, open and returned.")
+        parser.add_argument("--publishers", type=int, default=250)
+        parser.add_argument("--days", type=int, default=730, help="How far back the issue history goes.")
+        parser.add_argument("--seed", type=int, default=42, help="Random seed, for reproducible data.")
+        parser.add_argument("--batch-size", type=int, default=50_000)
+        parser.add_argument(
+            "--clear", action="store_true",
+            help="Delete all existing issues, students, books and publishers first.",
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        started = time.perf_counter()
+
+        if options["clear"]:
+            self.clear()
+        elif Books.objects.exists() or Students.objects.exists():
+            raise CommandError("The database already has books or students; pass --clear to replace them.")
+
+        publisher_ids = self.seed_publishers(options["publishers"])
+        books = self.seed_books(options["books"], publisher_ids)
+        student_ids = self.seed_students(options["students"])
+        open_issues = self.plan_open_issues(books, student_ids)
+        closed_count = self.seed_returned_issues(
+            max(options["issues"] - len(open_issues), 0), books, student_ids, options["days"]
+        )
+        # Current loans are the most recent, so they get the highest ids
+        self.insert_issues(open_issues)
+        open_count = len(open_issues)
+        self.refresh_availability()
+        caching.bump(caching.CATALOG, caching.CIRCULATION)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(publisher_ids)} publishers, {len(books)} books, {len(student_ids)} students, "
+            f"{open_count + closed_count} issues ({open_count} open) "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+
+    def clear(self):
+        # Plain DELETEs: the ORM would collect millions of cascaded issues first.
+        # Children before parents, or the foreign keys fail.
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (Fine, issues, Students, Books, Publisher):
+                cursor.execute(f"DELETE FROM {connection.ops.quote_name(model._meta.db_table)}")
+
+    def seed_publishers(self, count):
+        publishers = Publisher.objects.bulk_create(
+            Publisher(name=f"{self.random.choice(LAST_NAMES)} Press {n}", contact=f"+91 {9000000000 + n}")
+            for n in range(count)
+        )
+        return [publisher.pk for publisher in publishers]
+
+    def seed_books(self, count, publisher_ids):
+        rnd = self.random
+        rows = []
+        for n in range(count):
+            quantity = rnd.choices(QUANTITIES, QUANTITY_WEIGHTS)[0]
+            rows.append(Books(
+                book_no=f"BK{n:06d}",
+                title=f"{rnd.choice(TITLE_LEADS)} {rnd.choice(SUBJECTS)}",
+                author=f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)}",
+                quantity=quantity,
+                available_count=quantity,
+                publisher_id=rnd.choice(publisher_ids) if publisher_ids else None,
+                vol=str(rnd.randint(1, 3)),
+                published_year=date(rnd.randint(1985, 2025), 1, 1),
+                price=Decimal(rnd.randint(150, 2500)),
+                catelog_no=f"{rnd.randint(0, 999):03d}.{rnd.randint(0, 99):02d}",
+            ))
+        Books.objects.bulk_create(rows, batch_size=self.batch_size)
+        return list(Books.objects.order_by('id').values_list('id', 'quantity'))
+
+    def seed_students(self, count):
+        rnd = self.random
+        numbers = {}
+        rows = []
+        for _ in range(count):
+            batch = (rnd.choice(DEPARTMENTS), rnd.randint(22, 25))
+            numbers[batch] = numbers.get(batch, 0) + 1
+            first, last = rnd.choice(FIRST_NAMES), rnd.choice(LAST_NAMES)
+            rows.append(Students(
+                student_id=f"{batch[0]}{batch[1]}-{numbers[batch]:03d}",
+                name=f"{first} {last}",
+                email=f"{first}.{last}.{len(rows)}@college.example".lower(),
+            ))
+        Students.objects.bulk_create(rows, batch_size=self.batch_size)
+        return list(Students.objects.order_by('id').values_list('id', flat=True))
+
+    def pick_book(self, books):
+        # Cubing skews demand toward the head of the catalog: a few titles
+        # are borrowed constantly, most rarely
+        return books[int(len(books) * self.random.random() ** 3)]
+
+    def plan_open_issues(self, books, student_ids):
+        """Current loans, respecting copies on hand, the borrow limit and no duplicates."""
+        rnd = self.random
+        on_loan = {}
+        rows = []
+        for student_id in student_ids:
+            wanted = rnd.choices(OPEN_LOANS, OPEN_LOAN_WEIGHTS)[0]
+            wanted = min(wanted, Students.BORROW_LIMIT)
+            borrowed = set()
+            for _ in range(wanted * 3):
+                if len(borrowed) == wanted:
+                    break
+                book_id, quantity = self.pick_book(books)
+                if book_id in borrowed or on_loan.get(book_id, 0) >= (quantity or 0):
+                    continue
+                borrowed.add(book_id)
+                on_loan[book_id] = on_loan.get(book_id, 0) + 1
+                # Mostly recent, with a tail of overdue loans
+                borrowed_at = self.now - timedelta(days=min(rnd.expovariate(1 / 6), 60))
+                rows.append((book_id, student_id, borrowed_at, None))
+        rows.sort(key=lambda row: row[2])
+        return rows
+
+    def seed_returned_issues(self, total, books, student_ids, days):
+        """Returned loans spread over ``days``, busier on weekdays, in time order."""
+        if not total or not books or not student_ids:
+            return 0
+        rnd = self.random
+        start = self.now - timedelta(days=days)
+        day_weights = [WEEKDAY_WEIGHTS[(start + timedelta(days=d)).weekday()] for d in range(days)]
+        per_weight = total / sum(day_weights)
+
+        written, rows, cumulative = 0, [], 0.0
+        for day, weight in enumerate(day_weights):
+            cumulative += weight
+            target = total if day == days - 1 else round(per_weight * cumulative)
+            count = target - written - len(rows)
+            day_start = start + timedelta(days=day)
+            for seconds in sorted(rnd.uniform(8 * 3600, 18 * 3600) for _ in range(count)):
+                borrowed_at = day_start + timedelta(seconds=seconds)
+                # Median loan is a week; about a quarter come back late
+                kept = timedelta(days=min(rnd.lognormvariate(1.95, 0.5), 90))
+                returned_at = min(borrowed_at + kept, self.now)
+                book_id, _ = self.pick_book(books)
+                rows.append((book_id, rnd.choice(student_ids), borrowed_at, returned_at.date()))
+            if len(rows) >= self.batch_size:
+                self.insert_issues(rows)
+                written += len(rows)
+                rows = []
+        self.insert_issues(rows)
+        return written + len(rows)
+
+    def insert_issues(self, rows):
+        # executemany rather than bulk_create: model instances per row would
+        # dominate the run time at millions of rows
+        if not rows:
+            return
+        db = connections[DEFAULT_DB_ALIAS]
+        table = issues._meta.db_table
+        columns = ("book_id", "student_id", "time", "return_date", "due_date")
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            db.ops.quote_name(table),
+            ", ".join(db.ops.quote_name(c) for c in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        due = timedelta(days=OVERDUE_DAYS_LIMIT)
+        adapt_datetime, adapt_date = db.ops.adapt_datetimefield_value, db.ops.adapt_datefield_value
+        params = [
+            (book_id, student_id, adapt_datetime(borrowed_at), adapt_date(returned), adapt_datetime(borrowed_at + due))
+            for book_id, student_id, borrowed_at, returned in rows
+        ]
+        with transaction.atomic(), db.cursor() as cursor:
+            for offset in range(0, len(params), self.batch_size):
+                cursor.executemany(sql, params[offset:offset + self.batch_size])
+
+    def refresh_availability(self):
+        Books.objects.reconcile_availability()
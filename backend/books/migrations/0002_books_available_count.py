@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:58
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_available_count(apps, schema_editor):
+    Books = apps.get_model('books', 'Books')
+    books = Books.objects.annotate(
+        open_issues=Count('issues', filter=Q(issues__return_date__isnull=True))
+    )
+    updated = []
+    for book in books.iterator():
+        book.available_count = (book.quantity or 0) - book.open_issues
+        updated.append(book)
+    Books.objects.bulk_update(updated, ['available_count'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+        ('issues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='books',
+            name='available_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_available_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_books_available_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='books',
+            name='book_no',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:40
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from books import search
+    search.install(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    from books import search
+    search.uninstall(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_books_book_no_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, remove_search_index),
+    ]
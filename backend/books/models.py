@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
 from issues.models import issues
 
 class Publisher(models.Model):
@@ -10,8 +12,46 @@ class Publisher(models.Model):
         return self.name if self.name else "Unnamed Publisher"
 
 
+def expected_available():
+    """quantity minus the book's open issues: what available_count should hold."""
+    open_issues = (
+        issues.objects.filter(book=OuterRef('pk'), return_date__isnull=True)
+        .order_by().values('book').annotate(n=Count('id')).values('n')
+    )
+    return Coalesce('quantity', Value(0)) - Coalesce(Subquery(open_issues, output_field=IntegerField()), Value(0))
+
+
+class BooksQuerySet(models.QuerySet):
+    def reconcile_availability(self):
+        """
+        Set available_count from the open issues in one UPDATE, so a lend or
+        return committed meanwhile can't be overwritten. Returns the number
+        of books that had drifted.
+        """
+        return (
+            self.alias(expected=expected_available())
+            .exclude(available_count=F('expected'))
+            .update(available_count=expected_available())
+        )
+
+    def with_active_issues(self):
+        """
+        Prefetch open issues (with their students) into ``active_issues`` so
+        serializers don't query per row.
+        """
+        return self.prefetch_related(Prefetch(
+            'issues_set',
+            queryset=issues.objects.filter(return_date__isnull=True).select_related('student').order_by('pk'),
+            to_attr='active_issues',
+        ))
+
+    def with_circulation(self):
+        """with_active_issues() plus the publisher, for BooksSerializer."""
+        return self.select_related('publisher').with_active_issues()
+
+
 class Books(models.Model):
-    book_no = models.CharField(max_length=100, null=True, blank=True)
+    book_no = models.CharField(max_length=100, null=True, blank=True, db_index=True)
     title = models.CharField(max_length=255, null=True, blank=True)
     author = models.CharField(max_length=255, null=True, blank=True)
     date_of_issue = models.DateField(null=True, blank=True)
@@ -25,12 +65,33 @@ class Books(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     catelog_no = models.CharField(max_length=100, null=True, blank=True)
     remarks = models.TextField(null=True, blank=True)
+    # Copies on the shelf; kept in step with lending/returns, see reconcile_availability
+    available_count = models.IntegerField(default=0)
+
+    objects = BooksQuerySet.as_manager()
 
     def __str__(self):
         return self.title if self.title else "Untitled Book"
     
-    def available_copies(self):
-        issued_count = issues.objects.filter(book=self, return_date__isnull=True).count()
-        return self.quantity - issued_count
-    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.available_count = self.quantity or 0
+            return super().save(*args, **kwargs)
+
+        # Never write available_count from a possibly stale instance; apply the
+        # quantity change as a delta so concurrent lends/returns aren't lost.
+        if kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'available_count'
+            ]
+        with transaction.atomic():
+            old_quantity = Books.objects.filter(pk=self.pk).values_list('quantity', flat=True).first()
+            super().save(*args, **kwargs)
+            delta = (self.quantity or 0) - (old_quantity or 0)
+            if delta:
+                Books.objects.filter(pk=self.pk).update(available_count=F('available_count') + delta)
+            self.available_count = Books.objects.filter(pk=self.pk).values_list('available_count', flat=True).get()
 
+    def available_copies(self):
+        return self.available_count
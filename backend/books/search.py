@@ -0,0 +1,122 @@
+"""
+Full-text catalog search backed by an SQLite FTS5 external-content table.
+
+The index lives in ``books_books_fts`` and is kept in sync with
+``books_books`` by triggers, so ORM saves, deletes, bulk_create/bulk_update
+and the raw writes in ``import_catalog`` are all covered.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from books.models import Books
+
+FTS_TABLE = "books_books_fts"
+FTS_COLUMNS = ("title", "author", "catelog_no", "remarks")
+# bm25 weights, in FTS_COLUMNS order
+RANK_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+_columns = ", ".join(FTS_COLUMNS)
+_new_values = ", ".join(f"new.{c}" for c in FTS_COLUMNS)
+_old_values = ", ".join(f"old.{c}" for c in FTS_COLUMNS)
+
+CREATE_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_columns},
+        content='books_books', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_insert AFTER INSERT ON books_books BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_delete AFTER DELETE ON books_books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END
+    """,
+    # Only text column changes touch the index; available_count updates don't
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_update AFTER UPDATE OF {_columns} ON books_books BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+]
+TRIGGERS = ("books_fts_insert", "books_fts_delete", "books_fts_update")
+
+
+def is_supported(conn=connection):
+    return conn.vendor == "sqlite"
+
+
+def install(conn=connection):
+    """
+    Create the FTS table and triggers if missing and rebuild the index when
+    anything had to be (re)created. SQLite table rebuilds done by later
+    migrations drop triggers, so this also runs after every migrate.
+    """
+    if not is_supported(conn):
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            TRIGGERS,
+        )
+        if cursor.fetchone()[0] == len(TRIGGERS):
+            return False
+        for statement in CREATE_SQL:
+            cursor.execute(statement)
+    rebuild(conn)
+    return True
+
+
+def rebuild(conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def uninstall(conn=connection):
+    if not is_supported(conn):
+        return
+    with conn.cursor() as cursor:
+        for trigger in TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def to_match_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    terms = re.findall(r"\w+", text or "")
+    return " AND ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def search_ids(text, limit):
+    """Ids of the best ``limit`` (at least 1) matching books, best first."""
+    match = to_match_query(text)
+    if not match or limit < 1:
+        return []
+
+    if not is_supported():
+        filters = Q()
+        for term in re.findall(r"\w+", text):
+            filters &= (
+                Q(title__icontains=term) | Q(author__icontains=term)
+                | Q(catelog_no__icontains=term) | Q(remarks__icontains=term)
+            )
+        return list(Books.objects.filter(filters).order_by('title').values_list('id', flat=True)[:limit])
+
+    weights = ", ".join(str(w) for w in RANK_WEIGHTS)
+    # Every match is scored so the best ones can't be cut before ranking;
+    # SQLite keeps only the top ``limit`` while sorting (~70ms at 45k matches)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+            f" ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+            [match, limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
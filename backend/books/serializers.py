@@ -1,7 +1,14 @@
 from rest_framework import serializers
 from .models import Books, Publisher
 from issues.models import issues 
-from students.models import Students
+from backend.fast_serializers import RowSerializer
+
+
+def _active_issues(obj):
+    active = getattr(obj, 'active_issues', None)
+    if active is None:
+        active = issues.objects.filter(return_date__isnull=True, book=obj).select_related('student')
+    return active
 
 # class PublisherSerializer(serializers.ModelSerializer):
 #     class Meta:
@@ -16,6 +23,13 @@ class PublisherSerializer(serializers.ModelSerializer):
         fields = ['id', 'name']  # adjust fields as needed
 
 class BooksSerializer(serializers.ModelSerializer):
+    """
+    Pass ``fields`` (names) to render only those fields; write-only fields
+    are kept so the serializer still validates input.
+    """
+    # Need a join or a prefetch, so sparse reads only include them on request
+    EXPANDABLE = ("borrowed_by", "publisher")
+
     # Nested publisher read-only
     publisher = PublisherSerializer(read_only=True)
 
@@ -27,7 +41,7 @@ class BooksSerializer(serializers.ModelSerializer):
     )
     isbn = serializers.SerializerMethodField(None)
     total_quantity = serializers.IntegerField(source='quantity')
-    available_quantity = serializers.SerializerMethodField(None)
+    available_quantity = serializers.IntegerField(source='available_count', read_only=True)
     # Borrowed_by field can be null
     borrowed_by = serializers.SerializerMethodField(None)
 
@@ -51,18 +65,19 @@ class BooksSerializer(serializers.ModelSerializer):
             "catelog_no",
             "remarks",
         ]
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in list(self.fields):
+                if name not in fields and not self.fields[name].write_only:
+                    self.fields.pop(name)
+
     def get_isbn(self , obj):
         return None
     
-    def get_available_quantity(self , obj):
-        issued_books = issues.objects.filter(return_date__isnull=True,book = obj).count()
-        left_quantity = obj.quantity - issued_books
-        print("Available quantity for book id", obj.id, "is", left_quantity)
-        return left_quantity
-    
     def get_borrowed_by(self , obj):
-        active_issues = issues.objects.filter(return_date__isnull=True, book=obj)
-        return IssueSerializer(active_issues, many=True).data
+        return IssueSerializer(_active_issues(obj), many=True).data
     
 
 class IssueSerializer(serializers.ModelSerializer):
@@ -75,8 +90,50 @@ class IssueSerializer(serializers.ModelSerializer):
         fields = ["student_id", "student_name", "borrow_date", "return_date"]
 
     def get_student_id(self , obj):
-        student = Students.objects.get(id=obj.student.id)
-        return student.student_id
+        return obj.student.student_id
+
+class IssueRows(RowSerializer):
+    serializer_class = IssueSerializer
+    method_columns = {"student_id": ("student__student_id",)}
+
+    def get_student_id(self, row):
+        return row["student__student_id"]
+
+
+class BookRows(RowSerializer):
+    """BooksSerializer for read-only lists; see backend/fast_serializers.py."""
+    serializer_class = BooksSerializer
+    method_columns = {"publisher": ("publisher__id", "publisher__name")}
+
+    def prepare(self, rows):
+        # One query for the open issues of every book, like with_active_issues().
+        # Selected by id range rather than an IN list of every id, which a
+        # whole-catalog list would take past SQLite's parameter limit.
+        self.borrowed = {}
+        if not rows:
+            return
+        book_ids = [row["id"] for row in rows]
+        issue_rows = IssueRows()
+        open_issues = issue_rows.values(
+            issues.objects.filter(
+                return_date__isnull=True, book_id__gte=min(book_ids), book_id__lte=max(book_ids)
+            ).order_by('pk'),
+            "book_id",
+        )
+        for row in open_issues:
+            self.borrowed.setdefault(row["book_id"], []).append(issue_rows.to_representation(row))
+
+    def get_isbn(self, row):
+        return None
+
+    def get_borrowed_by(self, row):
+        return self.borrowed.get(row["id"], [])
+
+    def get_publisher(self, row):
+        if row["publisher__id"] is None:
+            return None
+        return {"id": row["publisher__id"], "name": row["publisher__name"]}
+
 
 class BookHistory(serializers.ModelSerializer):
 
@@ -87,7 +144,9 @@ class BookHistory(serializers.ModelSerializer):
         fields = ["book_id","title", "issues"]
 
     def get_issues(self , obj):
-        issue_qs = issues.objects.filter(book=obj)
+        issue_qs = self.context.get("issues")
+        if issue_qs is None:
+            issue_qs = issues.objects.filter(book=obj).select_related('student')
         return IssueSerializer(issue_qs, many=True).data
 
 
@@ -95,7 +154,7 @@ class BorrowSerializer(serializers.ModelSerializer):
 
     isbn = serializers.SerializerMethodField(None)
     total_quantity = serializers.IntegerField(source='quantity')
-    available_quantity = serializers.SerializerMethodField(None)
+    available_quantity = serializers.IntegerField(source='available_count', read_only=True)
     # Borrowed_by field can be null
     borrowed_by = serializers.SerializerMethodField()
 
@@ -115,12 +174,6 @@ class BorrowSerializer(serializers.ModelSerializer):
     def get_isbn(self , obj):
         return None
     
-    def get_available_quantity(self , obj):
-        issued_books = issues.objects.filter(return_date__isnull=True,book = obj).count()
-        left_quantity = obj.quantity - issued_books
-        return left_quantity
-    
     def get_borrowed_by(self , obj):
-        issue_qs = issues.objects.filter(return_date__isnull=True,book=obj)
-        return IssueSerializer(issue_qs, many=True).data
+        return IssueSerializer(_active_issues(obj), many=True).data
     
@@ -1,7 +1,510 @@
-from django.test import TestCase
-from books.serializers import BookHistory , BorrowSerializer
-from books.models import Books
-# Create your tests here.
-book_id = 1 
-book = Books.objects.get(id=book_id)
-print("Book History:",BorrowSerializer(book).data)
\ No newline at end of file
+import csv
+import json
+import re
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count, F
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from backend import caching
+from books.models import Books, Publisher
+from books.serializers import BookRows, BooksSerializer
+from issues.models import Fine, issues
+from students.models import Students
+
+
+class BooksListQueryTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.publisher = Publisher.objects.create(name="Pearson")
+        self.students = [
+            Students.objects.create(student_id=f"IA25-{i:03d}", name=f"Student {i}")
+            for i in range(5)
+        ]
+
+    def make_books(self, count):
+        for i in range(count):
+            book = Books.objects.create(
+                book_no=f"B{Books.objects.count():03d}",
+                title=f"Book {i}",
+                quantity=10,
+                publisher=self.publisher,
+            )
+            for student in self.students[:3]:
+                issues.objects.create(book=book, student=student)
+            Books.objects.filter(pk=book.pk).update(available_count=F('available_count') - 3)
+
+    def test_list_query_count_is_constant(self):
+        self.make_books(2)
+        with self.assertNumQueries(2):
+            self.client.get('/api/books/')
+
+        self.make_books(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/')
+
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(response.data[0]["available_quantity"], 7)
+        self.assertEqual(len(response.data[0]["borrowed_by"]), 3)
+
+    def test_borrowed_query_count_is_constant(self):
+        self.make_books(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/borrowed/')
+
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(response.data[0]["available_quantity"], 7)
+        self.assertEqual(response.data[0]["borrowed_by"][0]["student_id"], "IA25-000")
+
+    def test_returned_issues_are_not_counted(self):
+        self.make_books(1)
+        book = Books.objects.get()
+        self.client.post(f'/api/issues/return/{self.students[0].id}/{book.id}/')
+
+        response = self.client.get('/api/books/')
+        self.assertEqual(response.data[0]["available_quantity"], 8)
+        self.assertEqual(len(response.data[0]["borrowed_by"]), 2)
+
+
+class BooksSparseFieldsTests(APITestCase):
+    setUp = BooksListQueryTests.setUp
+    make_books = BooksListQueryTests.make_books
+
+    def test_fields_only(self):
+        self.make_books(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/books/?fields=id,title,available_quantity')
+        self.assertEqual(list(response.data[0]), ["id", "title", "available_quantity"])
+        self.assertEqual(response.data[0]["available_quantity"], 7)
+
+    def test_columns_are_narrowed(self):
+        self.make_books(1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/books/?fields=id,title')
+        self.assertNotIn('"remarks"', ctx.captured_queries[0]["sql"])
+
+    def test_expand_adds_expensive_fields(self):
+        self.make_books(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/?fields=id&expand=borrowed_by,publisher')
+        self.assertEqual(list(response.data[0]), ["id", "borrowed_by", "publisher"])
+        self.assertEqual(len(response.data[0]["borrowed_by"]), 3)
+        self.assertEqual(response.data[0]["publisher"]["name"], "Pearson")
+
+    def test_expand_alone_skips_unlisted_expensive_fields(self):
+        self.make_books(1)
+        full = self.client.get('/api/books/').data[0]
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/books/?expand=publisher')
+        expected = {name: value for name, value in full.items() if name != "borrowed_by"}
+        self.assertEqual(response.data[0], expected)
+
+    def test_detail_and_unknown_fields(self):
+        self.make_books(1)
+        book = Books.objects.get()
+        response = self.client.get(f'/api/books/{book.id}/?fields=title')
+        self.assertEqual(response.data, {"title": "Book 0"})
+        self.assertEqual(self.client.get('/api/books/?fields=title,shelf').status_code, 400)
+
+    def test_empty_fields_select_the_defaults(self):
+        self.make_books(1)
+        full = self.client.get('/api/books/').data[0]
+        expected = {name: value for name, value in full.items() if name not in BooksSerializer.EXPANDABLE}
+        for query in ('fields=', 'fields=,,', 'fields=%20'):
+            self.assertEqual(self.client.get(f'/api/books/?{query}').data, [expected], query)
+
+
+class AvailableCountTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=3)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+
+    def test_new_book_starts_fully_available(self):
+        self.assertEqual(self.book.available_count, 3)
+
+    def test_lend_and_return_update_counter(self):
+        self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 2)
+
+        self.client.post(f'/api/issues/return/{self.student.id}/{self.book.id}/')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 3)
+
+    def test_quantity_edit_keeps_loans_on_counter(self):
+        self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+        book = Books.objects.get(pk=self.book.pk)
+        book.quantity = 5
+        book.save()
+        self.assertEqual(book.available_count, 4)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        issues.objects.create(book=self.book, student=self.student)
+        out = StringIO()
+
+        call_command('reconcile_availability', '--dry-run', stdout=out)
+        self.assertIn("Found 1 with drifted availability", out.getvalue())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 3)
+
+        call_command('reconcile_availability', stdout=out)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 2)
+
+
+class BookHistoryPaginationTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=3)
+        student = Students.objects.create(student_id="IA25-001", name="Asha")
+        for _ in range(5):
+            issues.objects.create(book=self.book, student=student, return_date="2025-01-01")
+
+    def test_history_pages_newest_first(self):
+        response = self.client.get(f'/api/books/{self.book.id}/history/?page_size=2')
+        self.assertEqual(len(response.data["issues"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+        times = [row["borrow_date"] for row in response.data["issues"]]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(len(response.data["issues"]), 2)
+        self.assertLess(response.data["issues"][0]["borrow_date"], times[-1])
+
+    def test_history_unpaginated_by_default(self):
+        response = self.client.get(f'/api/books/{self.book.id}/history/')
+        self.assertEqual(len(response.data["issues"]), 5)
+        self.assertNotIn("next", response.data)
+
+
+class BookHistoryFilterTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Signals and Systems", quantity=5)
+        loans = [
+            # borrowed, returned
+            (datetime(2025, 1, 10, 9, tzinfo=dt_timezone.utc), "2025-01-14"),
+            (datetime(2025, 2, 1, 15, tzinfo=dt_timezone.utc), "2025-02-07"),
+            (datetime(2025, 3, 5, 11, tzinfo=dt_timezone.utc), None),
+        ]
+        for i, (borrowed, returned) in enumerate(loans):
+            student = Students.objects.create(student_id=f"IA25-{i:03d}", name=f"Student {i}")
+            issues.objects.create(book=self.book, student=student, time=borrowed, return_date=returned)
+        self.url = f'/api/books/{self.book.id}/history/'
+
+    def test_summary_over_whole_history(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.data["summary"],
+            {"total_loans": 3, "open_loans": 1, "average_loan_days": 5.0},
+        )
+
+    def test_date_range_inclusive_end(self):
+        response = self.client.get(self.url + '?start=2025-01-10&end=2025-02-01')
+        self.assertEqual([row["student_id"] for row in response.data["issues"]], ["IA25-001", "IA25-000"])
+        self.assertEqual(response.data["summary"]["total_loans"], 2)
+
+    def test_status_filter(self):
+        response = self.client.get(self.url + '?status=open')
+        self.assertEqual([row["student_id"] for row in response.data["issues"]], ["IA25-002"])
+        self.assertEqual(
+            response.data["summary"],
+            {"total_loans": 1, "open_loans": 1, "average_loan_days": None},
+        )
+        response = self.client.get(self.url + '?status=closed')
+        self.assertEqual(response.data["summary"]["total_loans"], 2)
+
+    def test_summary_counts_every_page(self):
+        response = self.client.get(self.url + '?page_size=1')
+        self.assertEqual(len(response.data["issues"]), 1)
+        self.assertEqual(response.data["summary"]["total_loans"], 3)
+
+    def test_bad_params(self):
+        for query in ('?start=yesterday', '?status=lost'):
+            self.assertEqual(self.client.get(self.url + query).status_code, 400)
+
+    def test_queries_flat(self):
+        # book, the page with its students, the summary
+        with self.assertNumQueries(3):
+            self.client.get(self.url + '?status=closed&page_size=10')
+
+
+class ImportCatalogTests(APITestCase):
+    def write_csv(self, directory, rows):
+        path = Path(directory) / "books.csv"
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["book_no", "title", "author", "quantity", "publisher", "price", "published_year"])
+            writer.writerows(rows)
+        return path
+
+    def test_upserts_by_book_no_and_rejects_bad_rows(self):
+        existing = Books.objects.create(book_no="B001", title="Old title", quantity=2)
+        student = Students.objects.create(student_id="IA25-001", name="Asha")
+        self.client.post(f'/api/issues/{student.id}/{existing.id}/')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_csv(directory, [
+                ["B001", "Digital Electronics", "Morris Mano", "5", "Pearson", "500.00", "2015-01-01"],
+                ["B002", "Power Systems", "C.L. Wadhwa", "3", "McGraw Hill", "", ""],
+                ["", "No book number", "", "1", "Pearson", "", ""],
+                ["B003", "Bad quantity", "", "many", "Pearson", "", ""],
+            ])
+            out = StringIO()
+            call_command("import_catalog", str(path), "--batch-size", "2", stdout=out)
+            with open(f"{path}.rejects.csv", encoding="utf-8") as f:
+                rejects = list(csv.reader(f))
+
+        self.assertIn("1 created, 1 updated, 0 unchanged, 2 rejected", out.getvalue())
+        self.assertEqual([r[1] for r in rejects[1:]], ["missing book_no", "invalid quantity 'many'"])
+
+        existing.refresh_from_db()
+        self.assertEqual(existing.title, "Digital Electronics")
+        self.assertEqual(existing.publisher.name, "Pearson")
+        self.assertEqual(existing.available_count, 4)
+
+        new_book = Books.objects.get(book_no="B002")
+        self.assertEqual(new_book.available_count, 3)
+        self.assertEqual(Publisher.objects.count(), 2)
+
+    def test_imports_publishers_csv_beside_books_by_default(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.write_csv(directory, [["B001", "Optics", "Hecht", "2", "Pearson", "", ""]])
+            (Path(directory) / "publishers.csv").write_text(
+                "name,address,contact\nPearson,Noida,+91 120 000\n", encoding="utf-8"
+            )
+            call_command("import_catalog", str(path), "--no-publishers", stdout=StringIO())
+            self.assertIsNone(Publisher.objects.get(name="Pearson").contact)
+
+            Publisher.objects.all().delete()
+            call_command("import_catalog", str(path), stdout=StringIO())
+
+        self.assertEqual(Publisher.objects.get(name="Pearson").contact, "+91 120 000")
+        self.assertEqual(Books.objects.get().publisher.address, "Noida")
+
+
+class BookSearchTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.digital = Books.objects.create(book_no="B001", title="Digital Electronics", author="Morris Mano", quantity=2)
+        self.power = Books.objects.create(
+            book_no="B002", title="Power Systems", author="C.L. Wadhwa", quantity=1,
+            remarks="Covers digital protection relays",
+        )
+
+    def search(self, q):
+        return [row["id"] for row in self.client.get('/api/books/search/', {"q": q}).data]
+
+    def test_prefix_match_ranks_title_above_remarks(self):
+        self.assertEqual(self.search("digi"), [self.digital.id, self.power.id])
+        self.assertEqual(self.search("mano elec"), [self.digital.id])
+        self.assertEqual(self.search(""), [])
+
+    def test_index_follows_saves_deletes_and_bulk_writes(self):
+        self.power.title = "Signals and Systems"
+        self.power.save()
+        self.assertEqual(self.search("signals"), [self.power.id])
+        self.assertEqual(self.search("power"), [])
+
+        Books.objects.bulk_create([Books(book_no="B003", title="Control Systems", quantity=1)])
+        self.assertEqual(len(self.search("systems")), 2)
+
+        self.digital.delete()
+        self.assertEqual(self.search("mano"), [])
+
+    def test_limit_is_clamped(self):
+        response = self.client.get('/api/books/search/', {"q": "digi", "limit": -1})
+        self.assertEqual([row["id"] for row in response.data], [self.digital.id])
+
+    def test_best_match_ranked_among_every_hit(self):
+        # Weak remarks-only matches with lower ids than the title match
+        Books.objects.filter(pk=self.digital.pk).delete()
+        Books.objects.bulk_create(
+            Books(book_no=f"R{i:04d}", title="Reference", remarks="digital", quantity=1) for i in range(1200)
+        )
+        best = Books.objects.create(book_no="B010", title="Digital Logic", quantity=1)
+        response = self.client.get('/api/books/search/', {"q": "digital", "limit": 1})
+        self.assertEqual([row["id"] for row in response.data], [best.id])
+
+    def test_quotes_and_operators_are_plain_text(self):
+        self.assertEqual(self.search('"digital" OR NOT'), [])
+        self.assertEqual(self.search('digital" AND'), [])
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=2)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+
+    def test_unchanged_list_is_served_from_cache_and_revalidates(self):
+        first = self.client.get('/api/books/')
+        etag = first["ETag"]
+
+        with self.assertNumQueries(0):
+            again = self.client.get('/api/books/')
+        self.assertEqual(again.data, first.data)
+
+        not_modified = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_lending_and_edits_invalidate(self):
+        etag = self.client.get('/api/books/')["ETag"]
+        borrowed_etag = self.client.get('/api/books/borrowed/')["ETag"]
+
+        self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]["available_quantity"], 1)
+        self.assertEqual(self.client.get('/api/books/borrowed/', HTTP_IF_NONE_MATCH=borrowed_etag).status_code, 200)
+
+        etag = response["ETag"]
+        self.client.patch(f'/api/books/{self.book.id}/', {"title": "Digital Logic"}, format="json")
+        response = self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data[0]["title"], "Digital Logic")
+
+    def test_bumps_from_other_processes_invalidate(self):
+        etag = self.client.get('/api/books/')["ETag"]
+
+        # A management command runs in its own process with its own cache objects
+        versions = settings.CACHES["versions"]
+        FileBasedCache(versions["LOCATION"], versions).incr(caching._version_key(caching.CATALOG))
+        self.assertEqual(self.client.get('/api/books/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class AsyncBookReadTests(APITestCase):
+    def setUp(self):
+        self.book = Books.objects.create(book_no="B001", title="Thermodynamics", quantity=3)
+        Books.objects.create(book_no="B002", title="Unread", quantity=3)
+        for i in range(3):
+            student = Students.objects.create(student_id=f"IA25-{i:03d}", name=f"Student {i}")
+            issues.objects.create(book=self.book, student=student)
+
+    def get_async(self, url):
+        return async_to_sync(self.async_client.get)(url)
+
+    def test_borrowed_matches_sync(self):
+        response = self.get_async('/api/async/books/borrowed/')
+        self.assertEqual(response.content, self.client.get('/api/books/borrowed/').content)
+        self.assertEqual(len(response.json()[0]["borrowed_by"]), 3)
+
+        # Shares the versioned cache and ETags with the DRF views
+        cached = async_to_sync(self.async_client.get)(
+            '/api/async/books/borrowed/', headers={"if-none-match": response["ETag"]}
+        )
+        self.assertEqual(cached.status_code, 304)
+
+    def test_history_matches_sync(self):
+        url = f'/books/{self.book.id}/history/'
+        self.assertEqual(self.get_async('/api/async' + url).content, self.client.get('/api' + url).content)
+        filtered = url + '?status=open&start=2000-01-01'
+        self.assertEqual(self.get_async('/api/async' + filtered).content, self.client.get('/api' + filtered).content)
+
+        page = self.get_async(f'/api/async{url}?page_size=2').json()
+        self.assertEqual(len(page["issues"]), 2)
+        self.assertIsNotNone(page["next"])
+        self.assertEqual(self.get_async('/api/async/books/999/history/').status_code, 404)
+
+
+class SeedLibraryTests(APITestCase):
+    def seed(self):
+        call_command(
+            "seed_library", books=60, students=40, issues=800, publishers=3, days=45, stdout=StringIO()
+        )
+
+    def test_generates_consistent_library(self):
+        self.seed()
+        self.assertEqual((Books.objects.count(), Students.objects.count(), issues.objects.count()), (60, 40, 800))
+        self.assertTrue(all(
+            re.fullmatch(r'[A-Z]{2}2[2-5]-\d{3}', sid) for sid in Students.objects.values_list('student_id', flat=True)
+        ))
+
+        open_issues = issues.objects.filter(return_date__isnull=True)
+        pairs = list(open_issues.values_list('student_id', 'book_id'))
+        self.assertEqual(len(pairs), len(set(pairs)))
+        self.assertLessEqual(max(open_issues.values('student').annotate(n=Count('id')).values_list('n', flat=True)), 5)
+        for borrowed, returned in issues.objects.filter(return_date__isnull=False).values_list('time', 'return_date'):
+            self.assertGreaterEqual(returned, borrowed.date())
+
+        out = StringIO()
+        call_command("reconcile_availability", dry_run=True, stdout=out)
+        self.assertIn("Found 0 with drifted availability", out.getvalue())
+
+    def test_refuses_to_mix_with_existing_data(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        # Clearing has to remove the fines ledger, which references issues and students
+        call_command("accrue_fines", stdout=StringIO())
+        self.assertTrue(Fine.objects.exists())
+        call_command("seed_library", books=5, students=5, issues=20, publishers=1, clear=True, stdout=StringIO())
+        self.assertEqual(Books.objects.count(), 5)
+
+
+class BenchmarkRoutesTests(APITestCase):
+    def test_fails_against_a_tighter_baseline(self):
+        call_command("seed_library", books=60, students=40, issues=400, publishers=3, days=30, stdout=StringIO())
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = Path(tmp) / "baseline.json"
+            call_command("benchmark_routes", requests=1, baseline=str(baseline), save_baseline=True, stdout=StringIO())
+            recorded = json.loads(baseline.read_text())
+            self.assertEqual(recorded["results"]["GET student_issues"]["queries"], 2)
+
+            call_command("benchmark_routes", requests=1, baseline=str(baseline), tolerance=100, stdout=StringIO())
+
+            recorded["results"]["GET student_issues"]["queries"] = 1
+            baseline.write_text(json.dumps(recorded))
+            with self.assertRaisesMessage(CommandError, "1 benchmark regression(s)"):
+                call_command(
+                    "benchmark_routes", requests=1, baseline=str(baseline), tolerance=100,
+                    stdout=StringIO(), stderr=StringIO(),
+                )
+
+
+class BookRowsTests(APITestCase):
+    def setUp(self):
+        publisher = Publisher.objects.create(name="Pearson")
+        student = Students.objects.create(student_id="IA25-001", name="Asha")
+        self.book = Books.objects.create(
+            book_no="B001", title="Optics", author="Hecht", quantity=3, publisher=publisher,
+            price=Decimal("450.5"), published_year="2017-01-01", remarks="Reference",
+        )
+        Books.objects.create(book_no="B002", title=None, quantity=None)
+        issues.objects.create(book=self.book, student=student)
+        issues.objects.create(book=self.book, student=student, return_date="2025-01-01")
+
+    def test_output_matches_books_serializer(self):
+        books = Books.objects.with_circulation().order_by('id')
+        rows = BookRows()
+        renderer = JSONRenderer()
+        self.assertEqual(
+            renderer.render(rows.serialize(rows.values(books))),
+            renderer.render(BooksSerializer(books, many=True).data),
+        )
+
+    def test_list_pages(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/books/?page_size=1')
+        self.assertEqual(len(response.data["results"][0]["borrowed_by"]), 1)
+        self.assertEqual(response.data["results"][0]["price"], "450.50")
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.data["results"][0]["publisher"], None)
+        self.assertEqual(response.data["results"][0]["borrowed_by"], [])
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command("benchmark_serializers", rows=10, repeat=1, stdout=out)
+        self.assertIn("books", out.getvalue())
+        self.assertIn("students", out.getvalue())
@@ -1,45 +1,220 @@
+from functools import cached_property
+
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
 from .models import Books
-from .serializers import BooksSerializer, BookHistory, BorrowSerializer
+from .serializers import BookRows, BooksSerializer, BookHistory, BorrowSerializer
 from rest_framework.decorators import api_view , action
 from rest_framework.response import Response
 from rest_framework import status
 from issues.models import issues
+from issues import reports
+from backend.pagination import KeysetPagination
+from books import search
+from backend.caching import CATALOG, CIRCULATION, cached_response
+from backend.async_api import apaginate, render_json
+
+
+def _borrowed_books():
+    # Books that have at least one active issue (not returned)
+    borrowed_book_ids = (
+        issues.objects
+        .filter(return_date__isnull=True)
+        .values_list('book_id', flat=True)
+        .distinct()
+    )
+    return Books.objects.filter(id__in=borrowed_book_ids).with_circulation().order_by('id')
+
+
+def _names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
 
 
 class BooksViewSet(viewsets.ModelViewSet):
     """
     CRUD API for Books
+
+    Reads take sparse fieldsets: ``?fields=id,title`` renders only those
+    fields and ``?expand=borrowed_by,publisher`` adds the expensive ones.
+    ``?expand=`` without ``fields`` means every field but the unlisted
+    expensive ones. Only the columns, joins and prefetches the requested
+    fields need are queried.
     """
-    queryset = Books.objects.all()
+    queryset = Books.objects.with_circulation().order_by('id')
     serializer_class = BooksSerializer
+    pagination_class = KeysetPagination
+
+    @cached_property
+    def requested_fields(self):
+        """Field names asked for, or None for the full payload."""
+        params = self.request.query_params
+        if self.request.method not in SAFE_METHODS or not ({'fields', 'expand'} & params.keys()):
+            return None
+
+        readable = [name for name, field in BooksSerializer().fields.items() if not field.write_only]
+        # An empty ?fields= (or only commas) selects the default fields
+        requested = set(_names(params.get('fields', '')))
+        if not requested:
+            requested = set(readable) - set(BooksSerializer.EXPANDABLE)
+        requested.update(_names(params.get('expand', '')))
+
+        unknown = requested.difference(readable)
+        if unknown:
+            raise ValidationError({"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        return requested
+
+    def get_queryset(self):
+        fields = self.requested_fields
+        if fields is None:
+            return super().get_queryset()
+
+        queryset = Books.objects.order_by('id')
+        if 'publisher' in fields:
+            queryset = queryset.select_related('publisher')
+        if 'borrowed_by' in fields:
+            queryset = queryset.with_active_issues()
+        # Model columns behind the fields; method fields have source '*'
+        serializer_fields = BooksSerializer().fields
+        columns = {serializer_fields[name].source for name in fields} - {'*'}
+        return queryset.only('id', *columns)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.requested_fields is not None:
+            kwargs['fields'] = self.requested_fields
+        return super().get_serializer(*args, **kwargs)
+
+    @cached_response(CATALOG, CIRCULATION)
+    def list(self, request, *args, **kwargs):
+        if self.requested_fields is not None:
+            return super().list(request, *args, **kwargs)
+
+        # The full payload, rendered from .values() rows by BookRows
+        rows = BookRows()
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.serialize(page))
+        return Response(rows.serialize(queryset))
 
     @action(detail=False, methods=['get'], url_path='borrowed')
+    @cached_response(CATALOG, CIRCULATION)
     def get_borrowed(self , request):
         """
         Returns books that are currently borrowed (at least one copy issued).
         """
-        # Books that have at least one active issue (not returned)
-        borrowed_book_ids = (
-            issues.objects
-            .filter(return_date__isnull=True)
-            .values_list('book_id', flat=True)
-            .distinct()
-        )
+        borrowed_books = _borrowed_books()
 
-        borrowed_books = Books.objects.filter(id__in=borrowed_book_ids)
+        page = self.paginate_queryset(borrowed_books)
+        if page is not None:
+            return self.get_paginated_response(BorrowSerializer(page, many=True).data)
 
         serializer = BorrowSerializer(borrowed_books, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'], url_path='search')
+    def search_books(self, request):
+        """
+        Ranked full-text search over title, author, catelog_no and remarks.
+        Every word in ``q`` is matched as a prefix.
+        """
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            limit = 20
+        ids = search.search_ids(request.query_params.get('q', ''), limit)
+
+        found = self.get_queryset().in_bulk(ids)
+        results = [found[book_id] for book_id in ids if book_id in found]
+        serializer = self.get_serializer(results, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+def _book_history(book, params):
+    """
+    The book's loans, newest first, narrowed by the optional ``start``/``end``
+    borrow dates (YYYY-MM-DD, end inclusive) and ``status`` (open or closed).
+    Raises ValueError on a bad parameter.
+    """
+    start, end = reports.parse_date_range(params)
+    status_param = params.get("status")
+    if status_param and status_param not in reports.LOAN_STATUSES:
+        raise ValueError("status must be open or closed")
+
+    issue_qs = reports.issues_in_range(start, end).filter(book=book)
+    if status_param:
+        issue_qs = issue_qs.filter(reports.LOAN_STATUSES[status_param])
+    return issue_qs
+
+
+def _history_page(issue_qs):
+    # Only what IssueSerializer renders; the student comes in the same query
+    return (
+        issue_qs.select_related('student')
+        .only('time', 'return_date', 'student__student_id', 'student__name')
+        .order_by('-time')
+    )
+
+
+HISTORY_PARAMS_ERROR = "start and end must be YYYY-MM-DD dates and status open or closed"
+
+
 @api_view(['GET'])
 def book_issues(request, book_id):
     try:
         book = Books.objects.get(id=book_id)
     except Books.DoesNotExist:
         return Response({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        history = _book_history(book, request.query_params)
+    except ValueError:
+        return Response({"error": HISTORY_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
+
+    issue_qs = _history_page(history)
+    paginator = KeysetPagination(ordering='-time')
+    page = paginator.paginate_queryset(issue_qs, request)
 
-    serializer = BookHistory(book)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    serializer = BookHistory(book, context={"issues": issue_qs if page is None else page})
+    data = serializer.data
+    # Over every matching loan, not just this page
+    data["summary"] = history.aggregate(**reports.LOAN_SUMMARY)
+    if page is not None:
+        data.update(paginator.get_links())
+    return Response(data, status=status.HTTP_200_OK)
+
+
+# Async variants of the read endpoints, served under /api/async/ (see backend/async_api.py)
+
+@cached_response(CATALOG, CIRCULATION)
+async def borrowed_books_async(request):
+    borrowed_books = _borrowed_books()
+    paginator = KeysetPagination()
+    page = await apaginate(paginator, borrowed_books, request)
+    if page is not None:
+        return render_json(paginator.get_paginated_response(BorrowSerializer(page, many=True).data).data)
+
+    borrowed_books = [book async for book in borrowed_books]
+    return render_json(BorrowSerializer(borrowed_books, many=True).data)
+
+
+async def book_issues_async(request, book_id):
+    try:
+        book = await Books.objects.aget(id=book_id)
+    except Books.DoesNotExist:
+        return render_json({"error": "Book not found"}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        history = _book_history(book, request.GET)
+    except ValueError:
+        return render_json({"error": HISTORY_PARAMS_ERROR}, status=status.HTTP_400_BAD_REQUEST)
 
+    issue_qs = _history_page(history)
+    paginator = KeysetPagination(ordering='-time')
+    page = await apaginate(paginator, issue_qs, request)
+    paginated = page is not None
+    if not paginated:
+        page = [issue async for issue in issue_qs]
 
+    data = BookHistory(book, context={"issues": page}).data
+    data["summary"] = await history.aaggregate(**reports.LOAN_SUMMARY)
+    if paginated:
+        data.update(paginator.get_links())
+    return render_json(data)
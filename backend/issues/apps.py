@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save, pre_delete
 
 
 class IssuesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issues'
+
+    def ready(self):
+        from backend.caching import CIRCULATION, bump_on_change
+        invalidate_circulation = bump_on_change(CIRCULATION)
+        post_save.connect(invalidate_circulation, sender=self.get_model('issues'), weak=False)
+        post_delete.connect(invalidate_circulation, sender=self.get_model('issues'), weak=False)
+
+        # Admin deletes and student cascades bypass issues.lending
+        from issues.lending import release_on_delete
+        pre_delete.connect(release_on_delete, sender=self.get_model('issues'), weak=False)
@@ -0,0 +1,85 @@
+"""
+Lend eligibility of a (student, book) pair, read in one query.
+
+The student row comes back annotated with the book's availability and
+title, the student's open-loan count, whether any open loan is overdue and
+whether they already hold this book; fines come from the row itself. Every
+check is then evaluated, so callers get all the reasons a loan would be
+refused rather than the first.
+"""
+from django.db.models import Count, Exists, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from books.models import Books
+from issues.models import issues
+from students.models import Students
+
+NO_COPIES = "No copies available"
+BORROW_LIMIT_REACHED = "Student has reached borrow limit"
+HAS_OVERDUE = "Student has overdue books"
+FINES_DUE = "Student has pending fines"
+ALREADY_BORROWED = "Student has already borrowed this book"
+
+
+class Eligibility:
+    """Checks of one lend; ``reasons`` lists every failed check, in lending order."""
+
+    def __init__(self, student_id, book_id, student=None):
+        self.student_id = student_id
+        self.book_id = book_id
+        self.student = student
+        self.book_title = getattr(student, 'book_title', None)
+        self.available_copies = getattr(student, 'book_available', None)
+        self.open_loans = getattr(student, 'open_loans', 0)
+        self.has_overdue = getattr(student, 'has_overdue', False)
+        self.already_borrowed = getattr(student, 'already_borrowed', False)
+        self.fines_due = student.fines_due() if student else 0
+        # Set by lending.issue_book when the loan is made
+        self.issue = None
+
+        self.reasons = []
+        if not self.found:
+            return
+        if self.available_copies < 1:
+            self.reasons.append(NO_COPIES)
+        if self.open_loans >= Students.BORROW_LIMIT:
+            self.reasons.append(BORROW_LIMIT_REACHED)
+        if self.has_overdue:
+            self.reasons.append(HAS_OVERDUE)
+        if self.fines_due > 0:
+            self.reasons.append(FINES_DUE)
+        if self.already_borrowed:
+            self.reasons.append(ALREADY_BORROWED)
+
+    @property
+    def found(self):
+        # available_count is never NULL, so None means there is no such book
+        return self.student is not None and self.available_copies is not None
+
+    @property
+    def eligible(self):
+        return self.found and not self.reasons
+
+
+def evaluate(student_id, book_id):
+    open_loans = issues.objects.filter(student=OuterRef('pk'), return_date__isnull=True)
+    book = Books.objects.filter(pk=book_id)
+    student = (
+        Students.objects.filter(pk=student_id)
+        .annotate(
+            book_title=Subquery(book.values('title')),
+            book_available=Subquery(book.values('available_count')),
+            open_loans=Coalesce(
+                Subquery(
+                    open_loans.order_by().values('student').annotate(n=Count('pk')).values('n'),
+                    output_field=IntegerField(),
+                ),
+                Value(0),
+            ),
+            has_overdue=Exists(open_loans.filter(due_date__lt=timezone.now())),
+            already_borrowed=Exists(open_loans.filter(book_id=book_id)),
+        )
+        .first()
+    )
+    return Eligibility(student_id, book_id, student)
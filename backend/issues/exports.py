@@ -0,0 +1,91 @@
+"""
+Streaming exports of the issue history.
+
+Rows are read with ``iterator()`` so only one chunk of issues is held in
+memory at a time, and the header is yielded before the query runs so the
+first byte goes out immediately.
+"""
+import csv
+import json
+
+from issues.models import issues
+
+CHUNK_SIZE = 2000
+# Rows are written to the response in groups, not one write per row
+ROWS_PER_WRITE = 200
+
+COLUMNS = (
+    "issue_id", "book_id", "book_no", "title", "student_id", "student_name",
+    "borrow_date", "due_date", "return_date",
+)
+
+
+def export_queryset(start=None, end=None, batch=None, book_id=None):
+    """Issues borrowed in [start, end), optionally of one batch and/or one book."""
+    qs = issues.objects.all()
+    if start is not None:
+        qs = qs.filter(time__gte=start)
+    if end is not None:
+        qs = qs.filter(time__lt=end)
+    if batch is not None:
+        qs = qs.filter(student__batch=batch)
+    if book_id is not None:
+        qs = qs.filter(book_id=book_id)
+    return (
+        qs.select_related('book', 'student')
+        .only(
+            'id', 'time', 'due_date', 'return_date',
+            'book__id', 'book__book_no', 'book__title',
+            'student__student_id', 'student__name',
+        )
+        .order_by('id')
+    )
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _rows(queryset):
+    for issue in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield (
+            issue.id,
+            issue.book.id,
+            issue.book.book_no,
+            issue.book.title,
+            issue.student.student_id,
+            issue.student.name,
+            _isoformat(issue.time),
+            _isoformat(issue.due_date),
+            _isoformat(issue.return_date),
+        )
+
+
+def _grouped(lines):
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= ROWS_PER_WRITE:
+            yield "".join(buffer)
+            buffer = []
+    if buffer:
+        yield "".join(buffer)
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted line back."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(queryset):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    yield from _grouped(writer.writerow(row) for row in _rows(queryset))
+
+
+def stream_ndjson(queryset):
+    yield from _grouped(
+        json.dumps(dict(zip(COLUMNS, row))) + "\n" for row in _rows(queryset)
+    )
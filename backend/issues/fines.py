@@ -0,0 +1,85 @@
+"""
+Overdue fines: FINE_PER_DAY for every full day a loan is kept past its due
+date, recorded per loan in the Fine ledger.
+
+accrue() is the nightly job. It prices every overdue open loan, and every
+loan returned late since the previous run, in one INSERT ... SELECT with an
+upsert, then rolls the changed students' outstanding totals into
+Students.fine_balance with one UPDATE. The work is a fixed handful of
+queries however many loans are late, and lending reads the balance from the
+student's row instead of summing their history.
+"""
+import logging
+from datetime import datetime, time
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from issues.models import FINE_PER_DAY, Fine, issues
+from students.models import Students
+
+logger = logging.getLogger(__name__)
+
+# SQLite: julianday() differences are days. The due date's time of day is
+# dropped, so a loan due Monday and returned Tuesday is one day late.
+ACCRUAL_SQL = """
+INSERT INTO {fines} (issue_id, student_id, days_overdue, amount, paid, accrued_on)
+SELECT id, student_id, days, days * %(rate)s, 0, %(today)s FROM (
+    SELECT id, student_id,
+           CAST(julianday(COALESCE(return_date, %(today)s)) - julianday(date(due_date)) AS INTEGER) AS days
+    FROM {issues}
+    WHERE (return_date IS NULL AND due_date < %(today_start)s)
+       OR (return_date >= %(since)s AND return_date > date(due_date))
+) AS late
+WHERE days > 0
+ON CONFLICT (issue_id) DO UPDATE SET
+    days_overdue = excluded.days_overdue,
+    amount = excluded.amount,
+    accrued_on = excluded.accrued_on
+WHERE {fines}.days_overdue != excluded.days_overdue
+"""
+
+
+def _outstanding():
+    per_student = (
+        Fine.objects.filter(student=OuterRef('pk'))
+        .order_by().values('student').annotate(total=Sum(F('amount') - F('paid'))).values('total')
+    )
+    return Coalesce(Subquery(per_student), Value(0), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def refresh_balances(students):
+    """Recompute Students.fine_balance of ``students`` (a queryset) from the ledger in one UPDATE."""
+    return students.update(fine_balance=_outstanding())
+
+
+def accrue(today=None, since=None):
+    """
+    Bring the ledger up to ``today`` (default: the current date). Loans
+    returned late before ``since`` are assumed priced already; it defaults
+    to the date of the previous run, or all history on the first.
+    Returns (ledger rows written, students whose balance was refreshed).
+    """
+    today = today or timezone.localdate()
+    if since is None:
+        since = Fine.objects.aggregate(last=Max('accrued_on'))['last']
+    ops = connection.ops
+    params = {
+        "rate": str(FINE_PER_DAY),
+        "today": ops.adapt_datefield_value(today),
+        "today_start": ops.adapt_datetimefield_value(timezone.make_aware(datetime.combine(today, time.min))),
+        "since": ops.adapt_datefield_value(since) if since else "0001-01-01",
+    }
+    sql = ACCRUAL_SQL.format(
+        fines=ops.quote_name(Fine._meta.db_table), issues=ops.quote_name(issues._meta.db_table)
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        written = cursor.rowcount
+        refreshed = refresh_balances(
+            Students.objects.filter(pk__in=Fine.objects.filter(accrued_on=today).values('student'))
+        )
+    logger.info("Fines accrued for %s: %s ledger rows, %s balances", today, written, refreshed)
+    return written, refreshed
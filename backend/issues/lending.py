@@ -0,0 +1,291 @@
+import random
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.db import OperationalError, transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+from django.utils import timezone
+
+from backend import caching
+from books.models import Books
+from issues import eligibility
+from issues.models import issues, OVERDUE_DAYS_LIMIT, default_due_date
+from students.models import Students
+
+LOCK_RETRIES = 8
+LOCK_BACKOFF = 0.02  # seconds, doubled on each retry
+# Books per availability UPDATE when returning in bulk
+ADJUST_CHUNK = 500
+
+
+def _is_lock_error(exc):
+    # "database is locked" (busy) and "database table is locked" (shared cache)
+    return "locked" in str(exc)
+
+
+def retry_on_lock(func, *args, **kwargs):
+    """Run ``func`` and retry with jittered backoff while SQLite reports a lock."""
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as exc:
+            if not _is_lock_error(exc) or attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(LOCK_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def _issue_book(student_id, book_id):
+    with transaction.atomic():
+        # BEGIN IMMEDIATE already holds the write lock, so the checks see a
+        # stable view and two desks can never both pass them for the last copy
+        check = eligibility.evaluate(student_id, book_id)
+        if not check.eligible:
+            return check
+        # Still conditional: where BEGIN doesn't lock (server databases) the
+        # decrement is what claims the copy
+        claimed = Books.objects.filter(pk=book_id, available_count__gte=1).update(
+            available_count=F('available_count') - 1
+        )
+        if not claimed:
+            check.reasons.append(eligibility.NO_COPIES)
+            return check
+
+        check.issue = issues.objects.create(book_id=book_id, student_id=student_id)
+        caching.bump(caching.CATALOG, caching.CIRCULATION)
+        return check
+
+
+def _return_book(book, student):
+    with transaction.atomic():
+        issue = issues.objects.filter(book=book, student=student, return_date__isnull=True).first()
+        if not issue:
+            return None
+        return_date = timezone.now()
+        # Only the request that actually closes the issue gives the copy back
+        closed = issues.objects.filter(pk=issue.pk, return_date__isnull=True).update(return_date=return_date)
+        if not closed:
+            return None
+        Books.objects.filter(pk=book.pk).update(available_count=F('available_count') + 1)
+        caching.bump(caching.CATALOG, caching.CIRCULATION)
+        issue.return_date = return_date
+        return issue
+
+
+def _renew_book(book, student, days):
+    with transaction.atomic():
+        issue = issues.objects.filter(book=book, student=student, return_date__isnull=True).first()
+        if not issue:
+            return None
+        # Extend from the current due date, or from today if already overdue
+        due_date = max(issue.due_date, timezone.now()) + timedelta(days=days)
+        renewed = issues.objects.filter(pk=issue.pk, return_date__isnull=True).update(due_date=due_date)
+        if not renewed:
+            return None
+        caching.bump(caching.CIRCULATION)
+        issue.due_date = due_date
+        return issue
+
+
+def issue_book(student_id, book_id):
+    """
+    Atomically lend the book to the student. Returns their Eligibility:
+    ``issue`` is the new loan, or None with every refusal in ``reasons``.
+    """
+    return retry_on_lock(_issue_book, student_id, book_id)
+
+
+def return_book(book, student):
+    """Atomically close the student's open issue of ``book``; None if there is none."""
+    return retry_on_lock(_return_book, book, student)
+
+
+def renew_book(book, student, days=OVERDUE_DAYS_LIMIT):
+    """Push back the due date of the student's open issue of ``book``; None if there is none."""
+    return retry_on_lock(_renew_book, book, student, days)
+
+
+class BatchItem:
+    """Outcome of one (student_id, book_id) operation in a batch."""
+
+    def __init__(self, student_id, book_id, student=None, book=None):
+        self.student_id = student_id
+        self.book_id = book_id
+        self.student = student
+        self.book = book
+        self.issue = None
+        self.message = None
+        # Every failed lend check; message is the first
+        self.reasons = []
+
+    @property
+    def found(self):
+        return self.student is not None and self.book is not None
+
+    @property
+    def success(self):
+        return self.issue is not None
+
+
+def _load_batch(pairs):
+    books = Books.objects.select_for_update().in_bulk({book_id for _, book_id in pairs})
+    students = Students.objects.select_for_update().in_bulk({student_id for student_id, _ in pairs})
+    return [
+        BatchItem(student_id, book_id, students.get(student_id), books.get(book_id))
+        for student_id, book_id in pairs
+    ]
+
+
+def _adjust_availability(deltas):
+    """Apply per-book available_count deltas in a single UPDATE."""
+    deltas = {book_id: delta for book_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Books.objects.filter(pk__in=deltas).update(available_count=F('available_count') + Case(
+        *[When(pk=book_id, then=Value(delta)) for book_id, delta in deltas.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
+
+
+def _issue_books(pairs):
+    with transaction.atomic():
+        items = _load_batch(pairs)
+        found = [item for item in items if item.found]
+
+        now = timezone.now()
+        open_counts = {}
+        open_pairs = set()
+        overdue = set()
+        for student_id, book_id, due_date in issues.objects.filter(
+            student_id__in={item.student_id for item in found}, return_date__isnull=True
+        ).values_list('student_id', 'book_id', 'due_date'):
+            open_counts[student_id] = open_counts.get(student_id, 0) + 1
+            open_pairs.add((student_id, book_id))
+            if due_date < now:
+                overdue.add(student_id)
+        available = {item.book_id: item.book.available_count for item in found}
+
+        # Same checks, in the same order, as eligibility.evaluate; earlier
+        # items in the batch count against later ones
+        to_create, taken = [], {}
+        for item in found:
+            if available[item.book_id] < 1:
+                item.reasons.append(eligibility.NO_COPIES)
+            if open_counts.get(item.student_id, 0) >= Students.BORROW_LIMIT:
+                item.reasons.append(eligibility.BORROW_LIMIT_REACHED)
+            if item.student_id in overdue:
+                item.reasons.append(eligibility.HAS_OVERDUE)
+            if item.student.fines_due() > 0:
+                item.reasons.append(eligibility.FINES_DUE)
+            if (item.student_id, item.book_id) in open_pairs:
+                item.reasons.append(eligibility.ALREADY_BORROWED)
+            if item.reasons:
+                item.message = item.reasons[0]
+            else:
+                available[item.book_id] -= 1
+                taken[item.book_id] = taken.get(item.book_id, 0) - 1
+                open_counts[item.student_id] = open_counts.get(item.student_id, 0) + 1
+                open_pairs.add((item.student_id, item.book_id))
+                item.issue = issues(book=item.book, student=item.student, time=now, due_date=default_due_date(now))
+                to_create.append(item.issue)
+
+        if to_create:
+            issues.objects.bulk_create(to_create)
+            _adjust_availability(taken)
+            caching.bump(caching.CATALOG, caching.CIRCULATION)
+        return items
+
+
+def _return_books(pairs):
+    with transaction.atomic():
+        items = _load_batch(pairs)
+        found = [item for item in items if item.found]
+
+        open_issues = {}
+        for issue in issues.objects.filter(
+            student_id__in={item.student_id for item in found},
+            book_id__in={item.book_id for item in found},
+            return_date__isnull=True,
+        ).order_by('time'):
+            open_issues.setdefault((issue.student_id, issue.book_id), []).append(issue)
+
+        return_date = timezone.now()
+        closed, given_back = [], {}
+        for item in found:
+            pending = open_issues.get((item.student_id, item.book_id))
+            if not pending:
+                item.message = "No active issue found for this book and student"
+                continue
+            item.issue = pending.pop(0)
+            item.issue.return_date = return_date
+            closed.append(item.issue.pk)
+            given_back[item.book_id] = given_back.get(item.book_id, 0) + 1
+
+        if closed:
+            issues.objects.filter(pk__in=closed, return_date__isnull=True).update(return_date=return_date)
+            _adjust_availability(given_back)
+            caching.bump(caching.CATALOG, caching.CIRCULATION)
+        return items
+
+
+def _return_issues(queryset):
+    with transaction.atomic():
+        still_open = queryset.filter(return_date__isnull=True).order_by()
+        per_book = dict(still_open.values('book').annotate(n=Count('pk')).values_list('book', 'n'))
+        closed = still_open.update(return_date=timezone.now())
+        # Chunked: each book costs parameters in the CASE
+        book_ids = list(per_book)
+        for offset in range(0, len(book_ids), ADJUST_CHUNK):
+            _adjust_availability({book_id: per_book[book_id] for book_id in book_ids[offset:offset + ADJUST_CHUNK]})
+        if closed:
+            caching.bump(caching.CATALOG, caching.CIRCULATION)
+        return closed
+
+
+def save_issue(issue):
+    """
+    Save an issue edited outside the lending paths, i.e. the admin form,
+    taking its copy off the shelf when it opens and putting it back when it
+    closes or moves to another book.
+    """
+    with transaction.atomic():
+        deltas = Counter()
+        if issue.pk is not None:
+            old = issues.objects.filter(pk=issue.pk).values('book_id', 'return_date').first()
+            if old and old['return_date'] is None:
+                deltas[old['book_id']] += 1
+        if issue.return_date is None:
+            deltas[issue.book_id] -= 1
+        issue.save()
+        _adjust_availability(deltas)
+        caching.bump(caching.CATALOG)
+
+
+def release_on_delete(sender, instance, **kwargs):
+    """pre_delete receiver: deleting an open issue, directly or by cascade, shelves its copy."""
+    if instance.return_date is None:
+        Books.objects.filter(pk=instance.book_id).update(available_count=F('available_count') + 1)
+        caching.bump(caching.CATALOG)
+
+
+def issue_books(pairs):
+    """
+    Lend many (student_id, book_id) pairs in one transaction: books, students
+    and open loans are loaded up front, eligibility is checked in memory and
+    the loans are written with bulk_create. Returns a BatchItem per pair.
+    """
+    return retry_on_lock(_issue_books, pairs)
+
+
+def return_books(pairs):
+    """Close many (student_id, book_id) loans in one transaction. Returns a BatchItem per pair."""
+    return retry_on_lock(_return_books, pairs)
+
+
+def return_issues(queryset):
+    """
+    Close every open issue in ``queryset`` with one UPDATE and give the
+    copies back, one UPDATE per ADJUST_CHUNK books. Returns how many closed.
+    """
+    return retry_on_lock(_return_issues, queryset)
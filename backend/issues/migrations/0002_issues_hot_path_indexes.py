@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_books_book_no_index'),
+        ('issues', '0001_initial'),
+        ('students', '0002_students_student_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='issues',
+            name='time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(fields=['book', 'return_date'], name='issue_book_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(fields=['student', 'return_date'], name='issue_student_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['book'], name='issue_open_book_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['student'], name='issue_open_student_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['time'], name='issue_open_time_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:30
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+
+OVERDUE_DAYS_LIMIT = 10
+
+
+def backfill_due_date(apps, schema_editor):
+    issues = apps.get_model('issues', 'issues')
+    issues.objects.filter(due_date__isnull=True).update(
+        due_date=F('time') + timedelta(days=OVERDUE_DAYS_LIMIT)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0002_issues_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issues',
+            name='due_date',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(backfill_due_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='issues',
+            name='due_date',
+            field=models.DateTimeField(),
+        ),
+        migrations.RemoveIndex(
+            model_name='issues',
+            name='issue_open_time_idx',
+        ),
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(condition=models.Q(('return_date__isnull', True)), fields=['due_date'], name='issue_open_due_idx'),
+        ),
+    ]
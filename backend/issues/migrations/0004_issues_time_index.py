@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_books_search_index'),
+        ('issues', '0003_issues_due_date'),
+        ('students', '0003_students_batch_class_code'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(fields=['time'], name='issue_time_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0004_issues_time_index'),
+        ('students', '0004_students_fine_balance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Fine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days_overdue', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('accrued_on', models.DateField(db_index=True)),
+                ('issue', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='fine', to='issues.issues')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fines', to='students.students')),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_books_search_index'),
+        ('issues', '0005_fine'),
+        ('students', '0004_students_fine_balance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issues',
+            index=models.Index(fields=['book', 'time', 'return_date'], name='issue_book_history_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_books_search_index'),
+        ('issues', '0006_issues_book_history_index'),
+        ('students', '0004_students_fine_balance'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='issues',
+            name='issue_book_return_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='issues',
+            name='issue_open_student_idx',
+        ),
+        # Drop the FK indexes directly: altering the fields would make
+        # SQLite's schema editor copy the whole table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='issues',
+                    name='book',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, to='books.books'),
+                ),
+                migrations.AlterField(
+                    model_name='issues',
+                    name='student',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='students.students'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "issues_issues_book_id_e75eb4fe"',
+                    reverse_sql='CREATE INDEX "issues_issues_book_id_e75eb4fe" ON "issues_issues" ("book_id")',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX IF EXISTS "issues_issues_student_id_f19a229f"',
+                    reverse_sql='CREATE INDEX "issues_issues_student_id_f19a229f" ON "issues_issues" ("student_id")',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('issues', '0007_drop_redundant_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='issues',
+            name='due_date',
+            field=models.DateTimeField(blank=True),
+        ),
+    ]
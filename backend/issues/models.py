@@ -1,11 +1,68 @@
+from datetime import timedelta
+from decimal import Decimal
 from django.db import models
 from django.utils import timezone
 
 OVERDUE_DAYS_LIMIT = 10
+# Charged for each full day a loan is kept past its due date
+FINE_PER_DAY = Decimal("2.00")
 # Create your models here.
 class issues(models.Model):
-    book = models.ForeignKey('books.Books' , on_delete=models.DO_NOTHING)
-    student = models.ForeignKey('students.Students', on_delete=models.CASCADE)
+    book = models.ForeignKey('books.Books' , on_delete=models.DO_NOTHING, db_index=False)
+    student = models.ForeignKey('students.Students', on_delete=models.CASCADE, db_index=False)
     time = models.DateTimeField(default=timezone.now)
     return_date = models.DateField(null=True,blank=True)
-    #issued by Teacher
\ No newline at end of file
+    # Set from time + OVERDUE_DAYS_LIMIT on creation, pushed back by renewals
+    due_date = models.DateTimeField(blank=True)
+    #issued by Teacher
+
+    class Meta:
+        indexes = [
+            # Open loans per book, kept small by the condition: availability,
+            # borrowed_by, reconcile_availability
+            models.Index(fields=['book'], condition=models.Q(return_date__isnull=True), name='issue_open_book_idx'),
+            # A student's loans by state: books_to_return and books_returned
+            # answered from the index alone, lend eligibility, batch lending,
+            # the student's history and the cascade on deleting a student
+            models.Index(fields=['student', 'return_date'], name='issue_student_return_idx'),
+            # Overdue list and fine accrual
+            models.Index(fields=['due_date'], condition=models.Q(return_date__isnull=True), name='issue_open_due_idx'),
+            # Date-range reports and exports
+            models.Index(fields=['time'], name='issue_time_idx'),
+            # A book's history newest first without a sort per page; return_date
+            # makes the history summary an index-only scan. Serves every other
+            # lookup by book too.
+            models.Index(fields=['book', 'time', 'return_date'], name='issue_book_history_idx'),
+            # Neither FK gets an index of its own: each leads an index above
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.due_date is None:
+            self.due_date = default_due_date(self.time)
+        super().save(*args, **kwargs)
+
+
+def default_due_date(borrowed_at):
+    return borrowed_at + timedelta(days=OVERDUE_DAYS_LIMIT)
+
+
+class Fine(models.Model):
+    """
+    Ledger row of the fine on one late loan, written by the nightly accrual
+    job (issues/fines.py). The student's outstanding total is rolled up
+    into Students.fine_balance.
+    """
+    issue = models.OneToOneField(issues, on_delete=models.CASCADE, related_name='fine')
+    student = models.ForeignKey('students.Students', on_delete=models.CASCADE, related_name='fines')
+    days_overdue = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Last run that changed the row; the rollup only revisits these students
+    accrued_on = models.DateField(db_index=True)
+
+    def __str__(self):
+        return f"{self.amount} on issue {self.issue_id}"
+
+    @property
+    def outstanding(self):
+        return self.amount - self.paid
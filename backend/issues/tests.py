@@ -1,4 +1,33 @@
+import csv
+import io
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APIClient, APITestCase
+from backend import snapshots
+from backend.instrumentation import registry
+from backend.pagination import EstimatedCountPaginator
+from books.models import Books
+from issues import eligibility, fines, lending
+from issues.models import FINE_PER_DAY, OVERDUE_DAYS_LIMIT, Fine, default_due_date, issues
+from issues.views import OVERDUE_CACHE_SECONDS
+from students.models import Students
+
 
 class LendBookTests(APITestCase):
     def test_lend_book(self):
@@ -11,3 +40,711 @@ class LendBookTests(APITestCase):
 
         self.assertIn(response.status_code, [200, 201, 400, 404])
 
+
+class ConcurrentLendTests(TransactionTestCase):
+    THREADS = 20
+    REQUESTS_PER_THREAD = 10
+    COPIES = 5
+
+    def setUp(self):
+        self.book = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=self.COPIES)
+        self.students = Students.objects.bulk_create(
+            Students(student_id=f"IA25-{i:03d}", name=f"Student {i}")
+            for i in range(self.THREADS * self.REQUESTS_PER_THREAD)
+        )
+
+    def test_last_copies_are_never_oversold(self):
+        results = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def desk(students):
+            client = APIClient()
+            barrier.wait()
+            try:
+                for student in students:
+                    response = client.post(f'/api/issues/{student.id}/{self.book.id}/')
+                    results.append(response.status_code)
+            finally:
+                connection.close()
+
+        n = self.REQUESTS_PER_THREAD
+        threads = [
+            threading.Thread(target=desk, args=(self.students[i * n:(i + 1) * n],))
+            for i in range(self.THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.book.refresh_from_db()
+        self.assertEqual(len(results), self.THREADS * n)
+        self.assertEqual(results.count(201), self.COPIES)
+        self.assertEqual(results.count(400), self.THREADS * n - self.COPIES)
+        self.assertEqual(self.book.available_count, 0)
+        self.assertEqual(issues.objects.filter(book=self.book, return_date__isnull=True).count(), self.COPIES)
+
+    def test_same_student_cannot_double_borrow(self):
+        book = Books.objects.create(book_no="B002", title="Power Systems", quantity=self.COPIES)
+        student = self.students[0]
+        results = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def desk():
+            client = APIClient()
+            barrier.wait()
+            try:
+                results.append(client.post(f'/api/issues/{student.id}/{book.id}/').status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=desk) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        book.refresh_from_db()
+        self.assertEqual(results.count(201), 1)
+        self.assertEqual(book.available_count, self.COPIES - 1)
+
+
+class ClassReportTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.books = [
+            Books.objects.create(book_no=f"B{i}", title=f"Book {i}", quantity=50) for i in range(5)
+        ]
+        self.s25 = Students.objects.create(student_id="IA25-001", name="Asha")
+        self.s24 = Students.objects.create(student_id="CS24-002", name="Ravi")
+        self.odd = Students.objects.create(student_id="guest", name="Guest")
+
+        # Batch 25 borrows book i (i + 1) times; batch 24 borrows book 0 once
+        for i, book in enumerate(self.books):
+            for _ in range(i + 1):
+                self.issue(book, self.s25, datetime(2025, 3, 1, tzinfo=dt_timezone.utc))
+        self.issue(self.books[0], self.s24, datetime(2025, 1, 15, tzinfo=dt_timezone.utc))
+        self.issue(self.books[1], self.odd, datetime(2025, 3, 1, tzinfo=dt_timezone.utc))
+
+    def issue(self, book, student, when):
+        issues.objects.create(book=book, student=student, time=when)
+
+    def test_report_groups_and_ranks_in_sql(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/issues/report/')
+
+        reports = {r["class_id"]: r for r in response.data["reports"]}
+        self.assertEqual(set(reports), {"24", "25", "Unknown"})
+        self.assertEqual(reports["25"]["class_name"], "Batch 2025")
+        self.assertEqual(reports["25"]["total_books_borrowed"], 15)
+        self.assertEqual(
+            [(b["book_id"], b["borrow_count"]) for b in reports["25"]["most_borrowed_books"]],
+            [(self.books[4].id, 5), (self.books[3].id, 4), (self.books[2].id, 3)],
+        )
+        self.assertEqual(reports["24"]["most_borrowed_books"][0]["title"], "Book 0")
+
+    def test_report_and_overdue_by_batch(self):
+        response = self.client.get('/api/issues/report/?batch=24')
+        self.assertEqual([r["class_id"] for r in response.data["reports"]], ["24"])
+
+        # Every ClassReportTests issue is long overdue
+        response = self.client.get('/api/issues/overdue/?batch=25')
+        self.assertEqual(len(response.data["overdue_issues"]), 15)
+        self.assertEqual({i["borrower"]["student_id"] for i in response.data["overdue_issues"]}, {"IA25-001"})
+
+    def test_report_date_range(self):
+        response = self.client.get('/api/issues/report/?start=2025-01-01&end=2025-01-31')
+        self.assertEqual([r["class_id"] for r in response.data["reports"]], ["24"])
+
+        response = self.client.get('/api/issues/report/?start=2025-13-01')
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN output is SQLite specific")
+class HotQueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(7)
+        books = Books.objects.bulk_create(
+            Books(book_no=f"B{i:04d}", title=f"Book {i}", quantity=20) for i in range(300)
+        )
+        students = Students.objects.bulk_create(
+            Students(student_id=f"IA{20 + i % 6}-{i:04d}", name=f"Student {i}") for i in range(1000)
+        )
+        now = timezone.now()
+        borrowed = [now - timedelta(days=rng.randint(0, 900)) for _ in range(30000)]
+        issues.objects.bulk_create(
+            issues(
+                book=rng.choice(books),
+                student=rng.choice(students),
+                time=when,
+                due_date=default_due_date(when),
+                # Most history is closed; a few percent are still on loan
+                return_date=None if rng.random() < 0.03 else now.date(),
+            )
+            for when in borrowed
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        cls.book = books[0]
+        cls.student = students[0]
+
+    def assertUsesIndex(self, queryset):
+        plan = queryset.explain()
+        self.assertNotRegex(plan, r"SCAN (issues_issues|students_students)(?! USING)", plan)
+        self.assertRegex(plan, r"USING (COVERING )?INDEX", plan)
+
+    def test_open_issues_by_book(self):
+        self.assertUsesIndex(issues.objects.filter(book=self.book, return_date__isnull=True))
+
+    def test_open_issues_by_student(self):
+        self.assertUsesIndex(issues.objects.filter(student=self.student, return_date__isnull=True))
+
+    def test_overdue_scan(self):
+        self.assertUsesIndex(
+            issues.objects.filter(return_date__isnull=True, due_date__lt=timezone.now()).order_by('due_date')
+        )
+
+    def test_student_lookup_by_student_id(self):
+        self.assertUsesIndex(Students.objects.filter(student_id="IA20-0000"))
+
+
+class DueDateTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=3)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+
+    def borrow(self, days_ago):
+        when = timezone.now() - timedelta(days=days_ago)
+        return issues.objects.create(book=self.book, student=self.student, time=when)
+
+    def test_due_date_is_set_on_create(self):
+        issue = self.borrow(0)
+        self.assertEqual(issue.due_date, issue.time + timedelta(days=OVERDUE_DAYS_LIMIT))
+
+    def test_overdue_list_uses_due_date(self):
+        issue = self.borrow(OVERDUE_DAYS_LIMIT + 3)
+        response = self.client.get('/api/issues/overdue/')
+        self.assertEqual(len(response.data["overdue_issues"]), 1)
+        self.assertEqual(response.data["overdue_issues"][0]["days_overdue"], 3)
+        self.assertEqual(response.data["overdue_issues"][0]["due_date"], issue.due_date.isoformat())
+
+    def test_cached_overdue_list_follows_the_clock(self):
+        issue = self.borrow(0)
+        now = time.time()
+        with mock.patch('backend.caching.time.time', return_value=now):
+            first = self.client.get('/api/issues/overdue/')
+            self.assertEqual(first.data["overdue_issues"], [])
+            # Falls due without any write bumping the cache versions
+            issues.objects.filter(pk=issue.pk).update(due_date=timezone.now() - timedelta(days=1))
+            self.assertEqual(self.client.get('/api/issues/overdue/').data["overdue_issues"], [])
+
+        with mock.patch('backend.caching.time.time', return_value=now + OVERDUE_CACHE_SECONDS):
+            response = self.client.get('/api/issues/overdue/', headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["overdue_issues"]), 1)
+
+    def test_renew_extends_from_today_when_overdue(self):
+        self.borrow(OVERDUE_DAYS_LIMIT + 3)
+        response = self.client.post(f'/api/issues/renew/{self.student.id}/{self.book.id}/')
+        self.assertEqual(response.status_code, 200)
+
+        issue = issues.objects.get()
+        self.assertGreater(issue.due_date, timezone.now() + timedelta(days=OVERDUE_DAYS_LIMIT - 1))
+        self.assertFalse(self.student.has_overdue_books())
+        self.assertEqual(self.client.get('/api/issues/overdue/').data["overdue_issues"], [])
+
+    def test_renew_without_loan(self):
+        response = self.client.post(f'/api/issues/renew/{self.student.id}/{self.book.id}/')
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchCirculationTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.textbook = Books.objects.create(book_no="B001", title="Digital Electronics", quantity=30)
+        self.scarce = Books.objects.create(book_no="B002", title="Power Systems", quantity=1)
+        self.students = Students.objects.bulk_create(
+            Students(student_id=f"IA25-{i:03d}", name=f"Student {i}") for i in range(25)
+        )
+
+    def test_class_wide_lend_uses_fixed_queries(self):
+        operations = [{"student_id": s.id, "book_id": self.textbook.id} for s in self.students]
+        with self.assertNumQueries(7):
+            response = self.client.post('/api/issues/batch/lend/', operations, format="json")
+
+        self.assertEqual(response.data["succeeded"], 25)
+        self.assertEqual(response.data["results"][0]["message"], "Book issued successfully")
+        self.textbook.refresh_from_db()
+        self.assertEqual(self.textbook.available_count, 5)
+        self.assertEqual(issues.objects.filter(return_date__isnull=True).count(), 25)
+
+    def test_per_item_failures_match_single_endpoint(self):
+        first, second = self.students[:2]
+        response = self.client.post('/api/issues/batch/lend/', {"operations": [
+            {"student_id": first.id, "book_id": self.scarce.id},
+            {"student_id": second.id, "book_id": self.scarce.id},
+            {"student_id": first.id, "book_id": self.scarce.id},
+            {"student_id": 9999, "book_id": self.scarce.id},
+        ]}, format="json")
+
+        self.assertFalse(response.data["success"])
+        self.assertEqual(
+            [r["message"] for r in response.data["results"]],
+            ["Book issued successfully", "No copies available", "No copies available", "Book or student not found"],
+        )
+        single = self.client.post(f'/api/issues/{second.id}/{self.scarce.id}/').data
+        self.assertEqual(response.data["results"][1], single)
+
+    def test_batch_return(self):
+        operations = [{"student_id": s.id, "book_id": self.textbook.id} for s in self.students[:3]]
+        self.client.post('/api/issues/batch/lend/', operations, format="json")
+
+        response = self.client.post('/api/issues/batch/return/', operations + operations[:1], format="json")
+        self.assertEqual(response.data["succeeded"], 3)
+        self.assertEqual(
+            response.data["results"][3]["message"], "No active issue found for this book and student"
+        )
+        self.textbook.refresh_from_db()
+        self.assertEqual(self.textbook.available_count, 30)
+
+        # Successful items have the single return_book shape
+        other = self.students[3]
+        self.client.post(f'/api/issues/{other.id}/{self.textbook.id}/')
+        single = self.client.post(f'/api/issues/return/{other.id}/{self.textbook.id}/').data
+        self.assertEqual(list(response.data["results"][0]), list(single))
+
+    def test_malformed_batch(self):
+        response = self.client.post('/api/issues/batch/lend/', [{"student_id": "x"}], format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_rejects_non_integer_and_out_of_range_ids(self):
+        book_id = self.textbook.id
+        for student_id in (True, "1", 1.0, 10 ** 20, -2 ** 63 - 1):
+            response = self.client.post(
+                '/api/issues/batch/lend/', [{"student_id": student_id, "book_id": book_id}], format="json"
+            )
+            self.assertEqual(response.status_code, 400, student_id)
+            self.assertEqual(response.data, {
+                "success": False, "message": "Each operation needs integer student_id and book_id", "results": [],
+            })
+        self.assertFalse(issues.objects.exists())
+
+
+class IssueExportTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = Books.objects.create(book_no="B001", title="Signals, Systems", quantity=10)
+        self.other = Books.objects.create(book_no="B002", title="Control Systems", quantity=10)
+        self.s25 = Students.objects.create(student_id="IA25-001", name="Asha")
+        self.s24 = Students.objects.create(student_id="CS24-002", name="Ravi")
+        issues.objects.create(book=self.book, student=self.s25, time=datetime(2025, 3, 1, tzinfo=dt_timezone.utc))
+        issues.objects.create(book=self.other, student=self.s25, time=datetime(2025, 3, 2, tzinfo=dt_timezone.utc))
+        issues.objects.create(book=self.book, student=self.s24, time=datetime(2025, 1, 15, tzinfo=dt_timezone.utc))
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        with self.assertNumQueries(1):
+            rows = list(csv.DictReader(io.StringIO(self.export('/api/issues/export/csv/'))))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["title"], "Signals, Systems")
+        self.assertEqual(rows[0]["student_id"], "IA25-001")
+        self.assertEqual(rows[0]["return_date"], "")
+
+    def test_ndjson_export_filters(self):
+        body = self.export('/api/issues/export/ndjson/?batch=25&start=2025-03-01&end=2025-03-01')
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["book_no"] for row in rows], ["B001"])
+
+        body = self.export(f'/api/issues/export/ndjson/?book={self.book.id}')
+        self.assertEqual(len(body.splitlines()), 2)
+
+    def test_export_rejects_bad_filters(self):
+        self.assertEqual(self.client.get('/api/issues/export/csv/?batch=2025').status_code, 400)
+        self.assertEqual(self.client.get('/api/issues/export/csv/?start=yesterday').status_code, 400)
+
+        # Every bad filter gets the same 400 body
+        bodies = [
+            self.client.get(f'/api/issues/export/csv/?{query}').json()
+            for query in ('batch=2x', 'batch=\u00b2\u00b3', 'book=one', 'end=2025-02-30')
+        ]
+        self.assertEqual(bodies, [bodies[0]] * 4)
+        self.assertFalse(bodies[0]["success"])
+
+
+class AsyncIssueReadTests(APITestCase):
+    def setUp(self):
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+        for i, days_ago in enumerate([2, 15, 30]):
+            book = Books.objects.create(book_no=f"B{i}", title=f"Book {i}", quantity=2)
+            issues.objects.create(book=book, student=self.student, time=timezone.now() - timedelta(days=days_ago))
+
+    def get_async(self, url):
+        return async_to_sync(self.async_client.get)(url)
+
+    def test_student_issues_match_sync(self):
+        url = f'/issues/{self.student.id}/'
+        self.assertEqual(self.get_async('/api/async' + url).content, self.client.get('/api' + url).content)
+        self.assertEqual(self.get_async('/api/async/issues/999/').status_code, 404)
+
+    def test_overdue_list_matches_sync(self):
+        response = self.get_async('/api/async/issues/overdue/')
+        self.assertEqual(response.content, self.client.get('/api/issues/overdue/').content)
+        self.assertEqual(len(response.json()["overdue_issues"]), 2)
+
+        page = self.get_async('/api/async/issues/overdue/?page_size=1').json()
+        self.assertEqual(page["overdue_issues"][0]["title"], "Book 2")
+
+
+class InstrumentationTests(APITestCase):
+    def setUp(self):
+        registry.reset()
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+        book = Books.objects.create(book_no="B001", title="Optics", quantity=2)
+        issues.objects.create(book=book, student=self.student)
+
+    def test_server_timing_counts_queries(self):
+        response = self.client.get(f'/api/issues/{self.student.id}/')
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"$')
+
+        response = async_to_sync(self.async_client.get)(f'/api/async/issues/{self.student.id}/')
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    def test_metrics_exposition(self):
+        self.client.get(f'/api/issues/{self.student.id}/')
+        self.client.get(f'/api/issues/{self.student.id}/')
+        self.client.get('/api/issues/999/')
+
+        body = self.client.get('/metrics').content.decode()
+        route = 'method="GET",route="/api/issues/<int:student_id>/"'
+        self.assertIn(f'http_requests_total{{{route},status="200"}} 2', body)
+        self.assertIn(f'http_requests_total{{{route},status="404"}} 1', body)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{route},le="+Inf"}} 3', body)
+        self.assertIn(f'http_request_db_queries_bucket{{{route},le="2"}} 3', body)
+        self.assertIn(f'http_request_duration_seconds_count{{{route}}} 3', body)
+
+
+@skipUnless(connection.vendor == 'sqlite', "Pragmas are SQLite specific")
+class SQLiteProfileTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_connection_applies_the_configured_pragmas(self):
+        self.assertEqual(self.pragma("journal_mode"), "wal")
+        self.assertEqual(self.pragma("synchronous"), 1)  # NORMAL
+        self.assertEqual(self.pragma("busy_timeout"), settings.SQLITE_PRAGMAS["busy_timeout"])
+        self.assertEqual(self.pragma("cache_size"), settings.SQLITE_PRAGMAS["cache_size"])
+
+    def test_write_transactions_begin_immediate(self):
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+
+@skipUnless(connection.vendor == 'sqlite', "Snapshots use SQLite's backup API")
+class AnalyticsSnapshotTests(TransactionTestCase):
+    # Under test the analytics alias mirrors the test database
+    databases = {'default', snapshots.ANALYTICS_ALIAS}
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "analytics.sqlite3"
+        override = override_settings(ANALYTICS_SNAPSHOT_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.book = Books.objects.create(book_no="B1", title="Heat Transfer", quantity=3)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+        issues.objects.create(book=self.book, student=self.student)
+
+    def snapshot_issue_count(self):
+        with sqlite3.connect(self.path) as snapshot:
+            return snapshot.execute(f"SELECT COUNT(*) FROM {issues._meta.db_table}").fetchone()[0]
+
+    def test_reads_primary_until_a_snapshot_exists(self):
+        response = self.client.get('/api/issues/report/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Snapshot-Age'], "0")
+
+        @snapshots.reads_from_snapshot
+        def view():
+            self.assertEqual(issues.objects.all().db, 'default')
+            return HttpResponse()
+        view()
+
+    def test_snapshot_is_a_point_in_time_copy(self):
+        snapshots.refresh()
+        issues.objects.create(book=self.book, student=Students.objects.create(student_id="IA25-002", name="Ravi"))
+
+        self.assertEqual(self.snapshot_issue_count(), 1)
+        self.assertLess(snapshots.snapshot_age(), 60)
+
+    def test_report_views_route_reads_to_the_snapshot(self):
+        snapshots.refresh()
+
+        @snapshots.reads_from_snapshot
+        def view():
+            self.assertEqual(issues.objects.all().db, snapshots.ANALYTICS_ALIAS)
+            return HttpResponse()
+        self.assertIn(view()['X-Snapshot-Age'], ("0", "1"))
+        # Writes and reads outside the decorated views stay on the primary
+        self.assertEqual(issues.objects.all().db, 'default')
+
+        for url in ('/api/issues/report/', '/api/issues/overdue/', '/api/issues/export/csv/'):
+            self.assertIn('X-Snapshot-Age', self.client.get(url))
+
+
+class FineAccrualTests(APITestCase):
+    def setUp(self):
+        self.book = Books.objects.create(book_no="B1", title="Soil Mechanics", quantity=10)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+        self.other = Students.objects.create(student_id="IA25-002", name="Ravi")
+
+    def loan(self, student, due, returned=None):
+        due = datetime.combine(due, datetime.min.time(), tzinfo=dt_timezone.utc).replace(hour=14)
+        return issues.objects.create(
+            book=self.book, student=student, time=due - timedelta(days=OVERDUE_DAYS_LIMIT),
+            due_date=due, return_date=returned,
+        )
+
+    def test_accrues_open_and_late_returned_loans_in_fixed_queries(self):
+        open_late = self.loan(self.student, date(2025, 3, 1))
+        returned_late = self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 4))
+        self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 1))
+        self.loan(self.other, date(2025, 3, 20))
+
+        with self.assertNumQueries(5):
+            written, refreshed = fines.accrue(today=date(2025, 3, 11))
+
+        self.assertEqual((written, refreshed), (2, 1))
+        self.assertEqual(Fine.objects.get(issue=open_late).days_overdue, 10)
+        self.assertEqual(Fine.objects.get(issue=returned_late).amount, 3 * FINE_PER_DAY)
+        self.student.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.student.fines_due(), 13 * FINE_PER_DAY)
+        self.assertEqual(self.other.fines_due(), 0)
+
+    def test_rerun_reprices_only_open_loans(self):
+        open_late = self.loan(self.student, date(2025, 3, 1))
+        self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 4))
+        fines.accrue(today=date(2025, 3, 11))
+
+        self.assertEqual(fines.accrue(today=date(2025, 3, 11)), (0, 1))
+        written, _ = fines.accrue(today=date(2025, 3, 12))
+
+        self.assertEqual(written, 1)
+        self.assertEqual(Fine.objects.get(issue=open_late).days_overdue, 11)
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.fine_balance, 14 * FINE_PER_DAY)
+
+    def test_payments_reduce_the_balance(self):
+        self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 6))
+        fines.accrue(today=date(2025, 3, 11))
+        Fine.objects.update(paid=Decimal("4.00"))
+
+        fines.refresh_balances(Students.objects.filter(pk=self.student.pk))
+
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.fine_balance, 5 * FINE_PER_DAY - Decimal("4.00"))
+
+    def test_saving_a_stale_student_keeps_the_balance(self):
+        stale = Students.objects.get(pk=self.student.pk)
+        self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 3))
+        fines.accrue(today=date(2025, 3, 11))
+
+        stale.name = "Asha K"
+        stale.save()
+
+        self.student.refresh_from_db()
+        self.assertEqual(self.student.name, "Asha K")
+        self.assertEqual(self.student.fine_balance, 2 * FINE_PER_DAY)
+
+    def test_lending_is_refused_with_fines_due(self):
+        self.loan(self.student, date(2025, 3, 1), returned=date(2025, 3, 3))
+        fines.accrue(today=date(2025, 3, 11))
+
+        response = self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], "Student has pending fines")
+
+
+class LendEligibilityTests(APITestCase):
+    def setUp(self):
+        self.book = Books.objects.create(book_no="B1", title="Machine Design", quantity=1)
+        self.student = Students.objects.create(student_id="IA25-001", name="Asha")
+
+    def test_every_failing_reason_in_one_query(self):
+        others = [Books.objects.create(book_no=f"O{i}", title=f"Other {i}", quantity=2) for i in range(5)]
+        for other in others:
+            issues.objects.create(book=other, student=self.student)
+        issues.objects.filter(book=others[0]).update(due_date=timezone.now() - timedelta(days=1))
+        issues.objects.create(book=self.book, student=Students.objects.create(student_id="IA25-002"))
+        Books.objects.filter(pk=self.book.pk).update(available_count=0)
+        Students.objects.filter(pk=self.student.pk).update(fine_balance=Decimal("6.00"))
+
+        with self.assertNumQueries(1):
+            check = eligibility.evaluate(self.student.id, self.book.id)
+
+        self.assertFalse(check.eligible)
+        self.assertEqual(check.reasons, [
+            eligibility.NO_COPIES, eligibility.BORROW_LIMIT_REACHED,
+            eligibility.HAS_OVERDUE, eligibility.FINES_DUE,
+        ])
+        self.assertEqual((check.available_copies, check.open_loans, check.fines_due), (0, 5, Decimal("6.00")))
+
+    def test_precheck_is_read_only(self):
+        response = self.client.get(f'/api/issues/eligibility/{self.student.id}/{self.book.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["eligible"])
+        self.assertEqual(response.data["reasons"], [])
+        self.assertEqual(response.data["book"], {"book_id": self.book.id, "title": "Machine Design"})
+        self.assertFalse(issues.objects.exists())
+
+    def test_lend_reports_all_reasons_and_precheck_agrees(self):
+        issues.objects.create(book=self.book, student=self.student)
+        Books.objects.filter(pk=self.book.pk).update(available_count=0)
+
+        precheck = self.client.get(f'/api/issues/eligibility/{self.student.id}/{self.book.id}/')
+        response = self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["message"], eligibility.NO_COPIES)
+        self.assertEqual(response.data["reasons"], [eligibility.NO_COPIES, eligibility.ALREADY_BORROWED])
+        self.assertEqual(precheck.data["reasons"], response.data["reasons"])
+
+    def test_lend_checks_and_writes_in_one_transaction(self):
+        # Savepoint, eligibility, claim, insert, release
+        with self.assertNumQueries(5):
+            response = self.client.post(f'/api/issues/{self.student.id}/{self.book.id}/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["book"]["title"], "Machine Design")
+
+    def test_unknown_book_or_student(self):
+        for url in (f'/api/issues/eligibility/{self.student.id}/999/', f'/api/issues/eligibility/999/{self.book.id}/'):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.post(f'/api/issues/{self.student.id}/999/').status_code, 404)
+
+
+class IssuesAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+        self.book = Books.objects.create(book_no="BK1", title="Compiler Design", quantity=50)
+        self.students = Students.objects.bulk_create(
+            Students(student_id=f"CS24-{i:03d}", name=f"Student {i}") for i in range(30)
+        )
+
+    def lend(self, students, **fields):
+        created = issues.objects.bulk_create(
+            issues(book=self.book, student=student, due_date=timezone.now() + timedelta(days=5), **fields)
+            for student in students
+        )
+        Books.objects.filter(pk=self.book.pk).update(available_count=50 - len(created))
+        return created
+
+    def changelist_queries(self, url='/admin/issues/issues/'):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.lend(self.students[:3])
+        few = self.changelist_queries()
+        self.lend(self.students[3:])
+
+        self.assertEqual(self.changelist_queries(), few)
+        self.assertEqual(self.changelist_queries('/admin/books/books/'), self.changelist_queries('/admin/books/books/'))
+
+    def test_add_form_defaults_due_date(self):
+        response = self.client.post('/admin/issues/issues/add/', {
+            "book": self.book.pk,
+            "student": self.students[0].pk,
+            "time_0": "2025-03-01",
+            "time_1": "10:00:00",
+        })
+        self.assertEqual(response.status_code, 302)
+        issue = issues.objects.get()
+        self.assertEqual(issue.due_date, default_due_date(issue.time))
+
+    def available(self):
+        self.book.refresh_from_db()
+        return self.book.available_count
+
+    def test_admin_edits_keep_availability(self):
+        form = {"book": self.book.pk, "student": self.students[0].pk, "time_0": "2025-03-01", "time_1": "10:00:00"}
+        self.client.post('/admin/issues/issues/add/', form)
+        issue = issues.objects.get()
+        self.assertEqual(self.available(), 49)
+
+        form.update({"due_date_0": "2025-03-11", "due_date_1": "10:00:00", "return_date": "2025-03-05"})
+        self.client.post(f'/admin/issues/issues/{issue.pk}/change/', form)
+        self.assertEqual(self.available(), 50)
+
+        form["return_date"] = ""
+        self.client.post(f'/admin/issues/issues/{issue.pk}/change/', form)
+        self.assertEqual(self.available(), 49)
+
+        self.client.post(f'/admin/issues/issues/{issue.pk}/delete/', {"post": "yes"})
+        self.assertFalse(issues.objects.exists())
+        self.assertEqual(self.available(), 50)
+
+    def test_student_cascade_shelves_open_copies(self):
+        self.lend(self.students[:1], return_date=timezone.now().date())
+        self.lend(self.students[:2])
+        self.assertEqual(self.available(), 48)
+        self.students[0].delete()
+        self.assertEqual(self.available(), 49)
+        self.students[1].delete()
+        self.assertEqual(self.available(), 50)
+
+    def test_search_and_overdue_filter(self):
+        late, on_time = self.lend(self.students[:2])
+        issues.objects.filter(pk=late.pk).update(due_date=timezone.now() - timedelta(days=1))
+
+        response = self.client.get('/admin/issues/issues/', {'q': 'CS24-001'})
+        self.assertEqual(list(response.context['cl'].result_list), [on_time])
+        response = self.client.get('/admin/issues/issues/', {'q': 'compiler'})
+        self.assertEqual(len(response.context['cl'].result_list), 2)
+        response = self.client.get('/admin/issues/issues/', {'overdue': 'overdue'})
+        self.assertEqual(list(response.context['cl'].result_list), [late])
+        response = self.client.get('/admin/issues/issues/', {'overdue': 'not_overdue'})
+        self.assertEqual(list(response.context['cl'].result_list), [on_time])
+
+    def test_mark_returned_updates_issues_and_availability_in_bulk(self):
+        loans = self.lend(self.students)
+        already_returned = loans[0]
+        issues.objects.filter(pk=already_returned.pk).update(return_date=timezone.now())
+        Books.objects.filter(pk=self.book.pk).update(available_count=21)
+
+        with CaptureQueriesContext(connection) as captured:
+            closed = lending.return_issues(issues.objects.filter(pk__in=[loan.pk for loan in loans]))
+        updates = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('UPDATE')]
+
+        self.assertEqual(closed, 29)
+        self.assertEqual(len(updates), 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_count, 50)
+        self.assertFalse(issues.objects.filter(return_date__isnull=True).exists())
+
+        response = self.client.post('/admin/issues/issues/', {
+            'action': 'mark_returned', '_selected_action': [loans[1].pk],
+        }, follow=True)
+        self.assertContains(response, "0 issue(s) marked as returned.")
+
+    def test_estimated_count(self):
+        loans = self.lend(self.students)
+        issues.objects.filter(pk=loans[5].pk).delete()
+
+        self.assertEqual(EstimatedCountPaginator(issues.objects.all(), 10).count, 30)
+        self.assertEqual(EstimatedCountPaginator(issues.objects.filter(student__in=self.students[:4]), 10).count, 4)
+        self.assertEqual(EstimatedCountPaginator(issues.objects.none(), 10).count, 0)
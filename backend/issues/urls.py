@@ -5,9 +5,15 @@ urlpatterns = [
     # path('', views.issue_list, name='issue_list'),
     # path('<int:pk>/', views.issue_detail, name='issue_detail'),
     path('<int:student_id>/<int:book_id>/', views.lend_book, name='lend_book'),
+    path('eligibility/<int:student_id>/<int:book_id>/', views.lend_eligibility, name='lend_eligibility'),
     path('<int:student_id>/', views.student_issues, name='student_issues'),
     path('return/<int:student_id>/<int:book_id>/', views.return_book, name='return_book'),
+    path('renew/<int:student_id>/<int:book_id>/', views.renew_book, name='renew_book'),
+    path('batch/lend/', views.batch_lend, name='batch_lend'),
+    path('batch/return/', views.batch_return, name='batch_return'),
     path('overdue/', views.overdue_list, name='overdue_issues'),
     path('report/', views.all_issues, name='all_issues'),
+    path('export/csv/', views.export_issues, {'export_format': 'csv'}, name='export_issues_csv'),
+    path('export/ndjson/', views.export_issues, {'export_format': 'ndjson'}, name='export_issues_ndjson'),
     # Add more paths as needed
 ]
\ No newline at end of file
@@ -1,71 +1,125 @@
+import logging
+
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.views.decorators.http import require_GET
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
 from rest_framework import status
-from issues.models import issues , OVERDUE_DAYS_LIMIT
+from issues.models import issues
 from books.models import Books
 from students.models import Students
+from issues import eligibility, exports, lending, reports
+from backend.pagination import KeysetPagination
+from backend.caching import CATALOG, CIRCULATION, cached_response
+from backend.snapshots import reads_from_snapshot
+from backend.async_api import apaginate, render_json
+
+logger = logging.getLogger(__name__)
+
+def _not_found(student_id, book_id):
+    logger.info("Book or student not found: student_id=%s book_id=%s", student_id, book_id)
+    return Response({
+        "success": False,
+        "message": "Book or student not found",
+        "student": {"student_id": str(student_id), "student_name": None},
+        "book": {"book_id": book_id, "title": None}
+    }, status=status.HTTP_404_NOT_FOUND)
+
+
+def _eligibility_parties(check):
+    return {
+        "student": {"student_id": str(check.student.id), "student_name": check.student.name},
+        "book": {"book_id": check.book_id, "title": check.book_title}
+    }
+
+
+# Issue fields of a successful lend / return, shared with the batch endpoints
+def _lend_fields(issue):
+    return {
+        "borrow_date": issue.time.isoformat(),
+        "return_date": issue.return_date.isoformat() if issue.return_date else None
+    }
+
+
+def _return_fields(issue):
+    return {"return_date": issue.return_date.isoformat()}
+
 
 @api_view(['POST'])
 def lend_book(request, student_id, book_id):
-    print("Lend book request received for student_id:", student_id, "and book_id:", book_id)
+    logger.debug("Lend request: student_id=%s book_id=%s", student_id, book_id)
+    check = lending.issue_book(student_id, book_id)
+    if not check.found:
+        return _not_found(student_id, book_id)
+
+    if check.issue is None:
+        logger.info("Lend refused: student_id=%s book_id=%s reasons=%s", student_id, book_id, check.reasons)
+        return Response({
+            "success": False,
+            "message": check.reasons[0],
+            "reasons": check.reasons,
+            **_eligibility_parties(check)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    logger.info("Issued book %s to student %s", book_id, student_id)
+    return Response({
+        "success": True,
+        "message": "Book issued successfully",
+        **_eligibility_parties(check),
+        **_lend_fields(check.issue)
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+def lend_eligibility(request, student_id, book_id):
+    """Read-only pre-check: every reason lend_book would refuse this loan right now."""
+    check = eligibility.evaluate(student_id, book_id)
+    if not check.found:
+        return _not_found(student_id, book_id)
+    return Response({
+        "success": True,
+        "eligible": check.eligible,
+        "reasons": check.reasons,
+        **_eligibility_parties(check),
+        "available_copies": check.available_copies,
+        "open_loans": check.open_loans,
+        "borrow_limit": Students.BORROW_LIMIT,
+        "has_overdue_books": check.has_overdue,
+        "fines_due": check.fines_due,
+        "already_borrowed": check.already_borrowed
+    }, status=status.HTTP_200_OK)
+
+from django.utils import timezone
+
+@api_view(['POST'])
+def return_book(request, student_id, book_id):
+    logger.debug("Return request: student_id=%s book_id=%s", student_id, book_id)
     try:
         book = Books.objects.get(id=book_id)
         student = Students.objects.get(id=student_id)
 
-        if book.available_copies() < 1:
-            print("No copies available for book_id:", book_id)
-            return Response({
-                "success": False,
-                "message": "No copies available",
-                "student": {"student_id": str(student.id), "student_name": student.name},
-                "book": {"book_id": book.id, "title": book.title}
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        elif student.currently_borrowed_count() >= Students.BORROW_LIMIT:
-            print("Student has reached borrow limit:", student_id)
-            return Response({
-                "success": False,
-                "message": "Student has reached borrow limit",
-                "student": {"student_id": str(student.id), "student_name": student.name},
-                "book": {"book_id": book.id, "title": book.title}
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        elif student.fines_due() > 0:
-            print("Student has pending fines:", student_id)
+        issue = lending.return_book(book, student)
+        if not issue:
+            logger.info("No active issue: student_id=%s book_id=%s", student_id, book_id)
             return Response({
                 "success": False,
-                "message": "Student has pending fines",
+                "message": "No active issue found for this book and student",
                 "student": {"student_id": str(student.id), "student_name": student.name},
                 "book": {"book_id": book.id, "title": book.title}
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        elif issues.objects.filter(book=book, student=student, return_date__isnull=True).exists():
-            print("Student has already borrowed this book:", student_id, book_id)
-            return Response({
-                "success": False,
-                "message": "Student has already borrowed this book",
-                "student": {"student_id": str(student.id), "student_name": student.name},
-                "book": {"book_id": book.id, "title": book.title}
-            }, status=status.HTTP_400_BAD_REQUEST)
+        logger.info("Returned book %s from student %s", book_id, student_id)
+        return Response({
+            "success": True,
+            "message": "Book returned successfully",
+            "student": {"student_id": str(student.id), "student_name": student.name},
+            "book": {"book_id": book.id, "title": book.title},
+            **_return_fields(issue)
+        }, status=status.HTTP_200_OK)
         
-        else:
-            print("Issuing book:", book_id, "to student:", student_id)
-            issue = issues.objects.create(
-                book=book,
-                student=student
-            )
-            return Response({
-                "success": True,
-                "message": "Book issued successfully",
-                "student": {"student_id": str(student.id), "student_name": student.name},
-                "book": {"book_id": book.id, "title": book.title},
-                "borrow_date": issue.time.isoformat(),
-                "return_date": issue.return_date.isoformat() if issue.return_date else None
-            }, status=status.HTTP_201_CREATED)
-            
     except (Books.DoesNotExist, Students.DoesNotExist):
-        print("Book or student not found:", student_id, book_id)
+        logger.info("Book or student not found: student_id=%s book_id=%s", student_id, book_id)
         return Response({
             "success": False,
             "message": "Book or student not found",
@@ -73,38 +127,113 @@ def lend_book(request, student_id, book_id):
             "book": {"book_id": book_id, "title": None}
         }, status=status.HTTP_404_NOT_FOUND)
 
-from django.utils import timezone
+
+MAX_BATCH_OPERATIONS = 1000
+# Ids must fit SQLite's signed 64-bit INTEGER
+MIN_ID, MAX_ID = -2 ** 63, 2 ** 63 - 1
+
+
+def _batch_id(value):
+    # bool is an int subclass, so compare the exact type
+    if type(value) is not int or not MIN_ID <= value <= MAX_ID:
+        raise ValueError(value)
+    return value
+
+
+def _batch_pairs(request):
+    """(student_id, book_id) pairs from a list body or {"operations": [...]}."""
+    operations = request.data
+    if isinstance(operations, dict):
+        operations = operations.get("operations")
+    if not isinstance(operations, list) or not operations:
+        raise ValueError("Expected a non-empty list of operations")
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+    try:
+        return [(_batch_id(op["student_id"]), _batch_id(op["book_id"])) for op in operations]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Each operation needs integer student_id and book_id")
+
+
+def _batch_item_result(item, success_message, success_fields):
+    """Per-item body, shaped like the single lend_book/return_book responses."""
+    if not item.found:
+        return {
+            "success": False,
+            "message": "Book or student not found",
+            "student": {"student_id": str(item.student_id), "student_name": None},
+            "book": {"book_id": item.book_id, "title": None}
+        }
+    result = {
+        "success": item.success,
+        "message": success_message if item.success else item.message,
+        "student": {"student_id": str(item.student.id), "student_name": item.student.name},
+        "book": {"book_id": item.book.id, "title": item.book.title}
+    }
+    if item.reasons:
+        result["reasons"] = item.reasons
+    if item.success:
+        result.update(success_fields(item.issue))
+    return result
+
+
+def _batch_response(request, operation, success_message, success_fields):
+    try:
+        pairs = _batch_pairs(request)
+    except ValueError as error:
+        return Response({"success": False, "message": str(error), "results": []}, status=status.HTTP_400_BAD_REQUEST)
+
+    items = operation(pairs)
+    results = [_batch_item_result(item, success_message, success_fields) for item in items]
+    succeeded = sum(1 for item in items if item.success)
+    logger.info("Batch processed: %s of %s operations succeeded", succeeded, len(items))
+    return Response({
+        "success": succeeded == len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": results
+    }, status=status.HTTP_200_OK)
+
 
 @api_view(['POST'])
-def return_book(request, student_id, book_id):
-    print("Return book request received for student_id:", student_id, "and book_id:", book_id)
+def batch_lend(request):
+    return _batch_response(request, lending.issue_books, "Book issued successfully", _lend_fields)
+
+
+@api_view(['POST'])
+def batch_return(request):
+    return _batch_response(request, lending.return_books, "Book returned successfully", _return_fields)
+
+
+@api_view(['POST'])
+def renew_book(request, student_id, book_id):
+    logger.debug("Renew request: student_id=%s book_id=%s", student_id, book_id)
     try:
         book = Books.objects.get(id=book_id)
         student = Students.objects.get(id=student_id)
 
-        issue = issues.objects.filter(book=book, student=student, return_date__isnull=True).first()
+        issue = lending.renew_book(book, student)
         if not issue:
-            print("No active issue found for student_id:", student_id, "and book_id:", book_id)
+            logger.info("No active issue: student_id=%s book_id=%s", student_id, book_id)
             return Response({
                 "success": False,
                 "message": "No active issue found for this book and student",
                 "student": {"student_id": str(student.id), "student_name": student.name},
                 "book": {"book_id": book.id, "title": book.title}
             }, status=status.HTTP_400_BAD_REQUEST)
-        
-        issue.return_date = timezone.now()
-        issue.save()
-        print("Book returned successfully for student_id:", student_id, "and book_id:", book_id)
+
+        logger.info("Renewed book %s for student %s", book_id, student_id)
         return Response({
             "success": True,
-            "message": "Book returned successfully",
+            "message": "Book renewed successfully",
             "student": {"student_id": str(student.id), "student_name": student.name},
             "book": {"book_id": book.id, "title": book.title},
-            "return_date": issue.return_date.isoformat()
+            "borrow_date": issue.time.isoformat(),
+            "due_date": issue.due_date.isoformat()
         }, status=status.HTTP_200_OK)
-        
+
     except (Books.DoesNotExist, Students.DoesNotExist):
-        print("Book or student not found:", student_id, book_id)
+        logger.info("Book or student not found: student_id=%s book_id=%s", student_id, book_id)
         return Response({
             "success": False,
             "message": "Book or student not found",
@@ -113,126 +242,210 @@ def return_book(request, student_id, book_id):
         }, status=status.HTTP_404_NOT_FOUND)
 
 
+def _student_issues_queryset(student):
+    return (
+        issues.objects.filter(student=student, return_date__isnull=True)
+        .select_related('book')
+        .order_by('-time')
+    )
+
+
+def _student_issue_data(issue):
+    return {
+        "book_id": issue.book.id,
+        "title": issue.book.title,
+        "author": issue.book.author,
+        "borrow_date": issue.time.isoformat(),
+        "due_date": issue.due_date,
+        "days_borrowed": (timezone.now() - issue.time).days
+    }
+
+
+def _student_not_found(student_id):
+    return {
+        "success": False,
+        "message": "Student not found",
+        "student": {"student_id": str(student_id), "student_name": None},
+        "issues": []
+    }
+
+
 @api_view(['GET'])
 def student_issues(request, student_id):
-    print("Fetching issues for student_id:", student_id)
+    logger.debug("Fetching issues for student_id=%s", student_id)
     try:
         student = Students.objects.get(id=student_id)
-        active_issues = issues.objects.filter(student=student, return_date__isnull=True)
+        active_issues = _student_issues_queryset(student)
+        paginator = KeysetPagination(ordering='-time')
+        page = paginator.paginate_queryset(active_issues, request)
+        if page is not None:
+            active_issues = page
         
-        issues_data = []
-        for issue in active_issues:
-            issues_data.append( {
-                "book_id": issue.book.id,
-                "title": issue.book.title,
-                "author": issue.book.author,
-                "borrow_date": issue.time.isoformat(),
-                "due_date": issue.time + timezone.timedelta(days=OVERDUE_DAYS_LIMIT),  # Assuming 2 weeks borrow period
-                "days_borrowed": (timezone.now() - issue.time).days
-            })
+        issues_data = [_student_issue_data(issue) for issue in active_issues]
         
-        print("Found", len(issues_data), "active issues for student_id:", student_id)
-        return Response({
+        logger.debug("Found %s active issues for student_id=%s", len(issues_data), student_id)
+        response_data = {
             "success": True,
             "student": {"student_id": str(student.id), "student_name": student.name},
             "issues": issues_data
-        }, status=status.HTTP_200_OK)
+        }
+        if page is not None:
+            response_data.update(paginator.get_links())
+        return Response(response_data, status=status.HTTP_200_OK)
         
     except Students.DoesNotExist:
-        print("Student not found:", student_id)
-        return Response({
-            "success": False,
-            "message": "Student not found",
-            "student": {"student_id": str(student_id), "student_name": None},
-            "issues": []
-        }, status=status.HTTP_404_NOT_FOUND)
+        logger.info("Student not found: %s", student_id)
+        return Response(_student_not_found(student_id), status=status.HTTP_404_NOT_FOUND)
     
 
 
+# Loans fall overdue with the clock, not just on writes; cached overdue
+# lists are refreshed at least this often
+OVERDUE_CACHE_SECONDS = 60
+
+
+def _overdue_queryset(params):
+    overdue_issues = (
+        issues.objects
+        .filter(return_date__isnull=True, due_date__lt=timezone.now())
+        .select_related('book', 'student')
+        .order_by('due_date')
+    )
+    # ?batch=25 narrows to one batch via the indexed Students.batch column
+    if params.get('batch'):
+        overdue_issues = overdue_issues.filter(student__batch=params['batch'])
+    return overdue_issues
+
+
+def _overdue_issue_data(issue):
+    return {
+        "book_id": issue.book.id,
+        "title": issue.book.title,
+        "borrower": {
+        "student_id": str(issue.student.student_id),
+        "student_name": issue.student.name,
+        "borrow_date": issue.time.isoformat()
+        },
+        "due_date": issue.due_date.isoformat(),
+        "days_overdue": (timezone.now() - issue.due_date).days
+    }
+
+
 @api_view(['GET'])
+@reads_from_snapshot
+@cached_response(CATALOG, CIRCULATION, time_bucket=OVERDUE_CACHE_SECONDS)
 def overdue_list(request):
-    print("Fetching overdue issues")
-    overdue_issues = issues.objects.filter(return_date__isnull=True, time__lt=timezone.now() - timezone.timedelta(days=OVERDUE_DAYS_LIMIT))
+    logger.debug("Fetching overdue issues")
+    overdue_issues = _overdue_queryset(request.query_params)
+    paginator = KeysetPagination(ordering='due_date')
+    page = paginator.paginate_queryset(overdue_issues, request)
+    if page is not None:
+        overdue_issues = page
     
-    overdue_data = []
-    for issue in overdue_issues:
-        days_overdue = (timezone.now() - (issue.time + timezone.timedelta(days=OVERDUE_DAYS_LIMIT))).days
-        overdue_data.append({
-            "book_id": issue.book.id,
-            "title": issue.book.title,
-            "borrower": {
-            "student_id": str(issue.student.student_id),
-            "student_name": issue.student.name,
-            "borrow_date": issue.time.isoformat()
-            },
-            "due_date": (issue.time + timezone.timedelta(days=OVERDUE_DAYS_LIMIT)).isoformat(),
-            "days_overdue": days_overdue
-        })
+    overdue_data = [_overdue_issue_data(issue) for issue in overdue_issues]
     
-    print("Found", len(overdue_data), "overdue issues")
-    return Response({
+    logger.debug("Found %s overdue issues", len(overdue_data))
+    response_data = {
         "success": True,
         "overdue_issues": overdue_data
-    }, status=status.HTTP_200_OK)
+    }
+    if page is not None:
+        response_data.update(paginator.get_links())
+    return Response(response_data, status=status.HTTP_200_OK)
 
 
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from rest_framework import status
-from .models import issues
-from collections import defaultdict
-import re
-
 @api_view(['GET'])
+@reads_from_snapshot
 def all_issues(request):
-    print("Fetching all issues")
+    logger.debug("Fetching class report")
+    try:
+        start, end = reports.parse_date_range(request.query_params)
+    except ValueError:
+        return Response({
+            "success": False,
+            "message": "start and end must be dates in YYYY-MM-DD format",
+            "reports": []
+        }, status=status.HTTP_400_BAD_REQUEST)
 
-    all_issues = issues.objects.select_related('book', 'student').order_by('-time')
-    
-    # Dictionary to group by class_id
-    class_reports = defaultdict(lambda: {
-        "class_id": "",
-        "class_name": "",
-        "total_books_borrowed": 0,
-        "most_borrowed_books": defaultdict(lambda: {"book_id": None, "title": "", "borrow_count": 0})
-    })
-
-    for issue in all_issues:
-        student_id = str(issue.student.student_id)
-        
-        # Extract class_id from student_id using pattern like IA25-001 -> 25
-        match = re.search(r"[A-Z]{2}(\d{2})-", student_id)
-        class_id = match.group(1) if match else "Unknown"
-
-        # Initialize class entry
-        class_entry = class_reports[class_id]
-        class_entry["class_id"] = class_id
-        class_entry["class_name"] = f"Batch 20{class_id}"
-        class_entry["total_books_borrowed"] += 1
-
-        # Track borrow count per book
-        book_id = issue.book.id
-        book_title = issue.book.title
-        book_entry = class_entry["most_borrowed_books"][book_id]
-        book_entry["book_id"] = book_id
-        book_entry["title"] = book_title
-        book_entry["borrow_count"] += 1
-
-    # Convert defaultdicts to normal lists
-    formatted_reports = []
-    for cid, class_info in class_reports.items():
-        books_list = list(class_info["most_borrowed_books"].values())
-        # Sort most borrowed books descending by borrow_count
-        books_list.sort(key=lambda x: x["borrow_count"], reverse=True)
-        formatted_reports.append({
-            "class_id": class_info["class_id"],
-            "class_name": class_info["class_name"],
-            "total_books_borrowed": class_info["total_books_borrowed"],
-            "most_borrowed_books": books_list[:3]  # top 3
-        })
-
-    print("Found", len(formatted_reports), "classes")
+    formatted_reports = reports.class_report(start, end, batch=request.query_params.get("batch") or None)
+
+    logger.debug("Class report has %s classes", len(formatted_reports))
     return Response({
         "success": True,
         "reports": formatted_reports
     }, status=status.HTTP_200_OK)
+
+
+EXPORT_FORMATS = {
+    "csv": (exports.stream_csv, "text/csv"),
+    "ndjson": (exports.stream_ndjson, "application/x-ndjson"),
+}
+
+
+# Plain Django view: DRF content negotiation would turn "Accept: text/csv" into a 406
+@require_GET
+@reads_from_snapshot
+def export_issues(request, export_format):
+    params = request.GET
+    try:
+        start, end = reports.parse_date_range(params)
+        batch = reports.parse_batch(params)
+        book_id = int(params["book"]) if params.get("book") else None
+    except ValueError:
+        return JsonResponse({
+            "success": False,
+            "message": "start and end must be dates in YYYY-MM-DD format, batch two digits and book an integer id"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = exports.export_queryset(start, end, batch=batch, book_id=book_id)
+    # Rows stream after the view returns; pin the database routed to now
+    queryset = queryset.using(queryset.db)
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(queryset), content_type=content_type)
+    filename = f"issues-{timezone.now():%Y%m%d}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+# Async variants of the read endpoints, served under /api/async/ (see backend/async_api.py)
+
+async def student_issues_async(request, student_id):
+    try:
+        student = await Students.objects.aget(id=student_id)
+    except Students.DoesNotExist:
+        return render_json(_student_not_found(student_id), status=status.HTTP_404_NOT_FOUND)
+
+    active_issues = _student_issues_queryset(student)
+    paginator = KeysetPagination(ordering='-time')
+    page = await apaginate(paginator, active_issues, request)
+    paginated = page is not None
+    if not paginated:
+        page = [issue async for issue in active_issues]
+
+    response_data = {
+        "success": True,
+        "student": {"student_id": str(student.id), "student_name": student.name},
+        "issues": [_student_issue_data(issue) for issue in page]
+    }
+    if paginated:
+        response_data.update(paginator.get_links())
+    return render_json(response_data)
+
+
+@reads_from_snapshot
+@cached_response(CATALOG, CIRCULATION, time_bucket=OVERDUE_CACHE_SECONDS)
+async def overdue_list_async(request):
+    overdue_issues = _overdue_queryset(request.GET)
+    paginator = KeysetPagination(ordering='due_date')
+    page = await apaginate(paginator, overdue_issues, request)
+    paginated = page is not None
+    if not paginated:
+        page = [issue async for issue in overdue_issues]
+
+    response_data = {
+        "success": True,
+        "overdue_issues": [_overdue_issue_data(issue) for issue in page]
+    }
+    if paginated:
+        response_data.update(paginator.get_links())
+    return render_json(response_data)
@@ -4,4 +4,5 @@ from .models import Students
 
 @admin.register(Students)
 class StudentAdmin(admin.ModelAdmin):
-    list_display = ('student_id', 'name', 'email')
\ No newline at end of file
+    list_display = ('student_id', 'name', 'email', 'class_code', 'batch', 'fine_balance')
+    list_filter = ('batch',)
\ No newline at end of file
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class StudentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'students'
+
+    def ready(self):
+        from backend.caching import CIRCULATION, bump_on_change
+        invalidate_circulation = bump_on_change(CIRCULATION)
+        post_save.connect(invalidate_circulation, sender=self.get_model('Students'), weak=False)
+        post_delete.connect(invalidate_circulation, sender=self.get_model('Students'), weak=False)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='students',
+            name='student_id',
+            field=models.CharField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+import re
+
+from django.db import migrations, models
+
+BATCH_PATTERN = re.compile(r'^[A-Z]{2}([0-9]{2})-')
+
+
+def backfill_batch_and_class(apps, schema_editor):
+    # Same derivation as Students.set_derived_fields(), frozen here. Students
+    # share a handful of (batch, class) pairs, so update one pair at a time.
+    Students = apps.get_model('students', 'Students')
+    groups = {}
+    for pk, student_id in Students.objects.values_list('id', 'student_id').iterator(chunk_size=2000):
+        match = BATCH_PATTERN.match(student_id or "")
+        key = (match.group(1) if match else None, student_id.split('-')[0] if student_id else None)
+        groups.setdefault(key, []).append(pk)
+    for (batch, class_code), ids in groups.items():
+        for start in range(0, len(ids), 500):
+            Students.objects.filter(id__in=ids[start:start + 500]).update(batch=batch, class_code=class_code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0002_students_student_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='students',
+            name='batch',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=2, null=True),
+        ),
+        migrations.AddField(
+            model_name='students',
+            name='class_code',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20, null=True),
+        ),
+        migrations.RunPython(backfill_batch_and_class, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0003_students_batch_class_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='students',
+            name='fine_balance',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+        ),
+    ]
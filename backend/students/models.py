@@ -1,24 +1,104 @@
+import re
+
 from django.db import models
-from issues.models import issues ,OVERDUE_DAYS_LIMIT
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from issues.models import issues
 from django.utils import timezone
-from datetime import timedelta
+
+
+# Student IDs look like IA25-001: class IA25, batch 25
+BATCH_PATTERN = re.compile(r'^[A-Z]{2}([0-9]{2})-')
+
+
+def derive_batch(student_id):
+    match = BATCH_PATTERN.match(student_id or "")
+    return match.group(1) if match else None
+
+
+def derive_class_code(student_id):
+    return student_id.split('-')[0] if student_id else None
+
+
+def _issue_count(**filters):
+    """Count of the outer student's issues matching ``filters``, as a subquery."""
+    matching = (
+        issues.objects.filter(student=OuterRef('pk'), **filters)
+        .order_by().values('student').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(matching, output_field=IntegerField()), Value(0))
+
+
+class StudentsQuerySet(models.QuerySet):
+    def with_loan_stats(self, overdue=False):
+        """
+        Annotate ``books_to_return`` and ``books_returned`` (and, with
+        ``overdue``, ``books_overdue``) as conditional counts of the
+        student's issues, so a whole list comes back in one query.
+
+        Each count is a correlated subquery answered from the
+        (student, return_date) and open-loan indexes. A JOIN + GROUP BY would
+        aggregate every issue before a page's LIMIT applies.
+        """
+        stats = {
+            'books_to_return': _issue_count(return_date__isnull=True),
+            'books_returned': _issue_count(return_date__isnull=False),
+        }
+        if overdue:
+            stats['books_overdue'] = _issue_count(return_date__isnull=True, due_date__lt=timezone.now())
+        return self.annotate(**stats)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() isn't called for bulk inserts, so derive the columns here
+        objs = list(objs)
+        for student in objs:
+            student.set_derived_fields()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 # Create your models here.
 class Students(models.Model):
     BORROW_LIMIT = 5
-    student_id = models.CharField()
+    student_id = models.CharField(db_index=True)
     name = models.CharField(null=True , blank=True)
     email = models.EmailField(null=True, blank=True)
+    # Derived from student_id on save; stored so filtering and grouping by
+    # batch or class is an indexed SQL predicate
+    batch = models.CharField(max_length=2, null=True, blank=True, db_index=True, editable=False)
+    class_code = models.CharField(max_length=20, null=True, blank=True, db_index=True, editable=False)
+    # Unpaid fines, rolled up from the issues.Fine ledger by the accrual job
+    fine_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+
+    objects = StudentsQuerySet.as_manager()
 
     def __str__(self):
         return self.name if self.name else "Unnamed Student"
+
+    def set_derived_fields(self):
+        self.batch = derive_batch(self.student_id)
+        self.class_code = derive_class_code(self.student_id)
+
+    def save(self, *args, **kwargs):
+        self.set_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'student_id' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'batch', 'class_code'}
+        elif update_fields is None and not self._state.adding:
+            # fine_balance is written only by issues.fines.refresh_balances;
+            # never write it back from a possibly stale instance
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'fine_balance'
+            ]
+        super().save(*args, **kwargs)
     def has_overdue_books(self):
-        if issues.objects.filter(student=self, return_date__isnull=True , time__lt=timezone.now() - timedelta(days=OVERDUE_DAYS_LIMIT) ).exists() :
+        if issues.objects.filter(student=self, return_date__isnull=True , due_date__lt=timezone.now()).exists() :
             return True
         return False
     def currently_borrowed_count(self):
         return issues.objects.filter(student=self, return_date__isnull=True).count()
     
     def fines_due(self):
-        return 0
+        # Read from the student's own row: no scan of their loan history
+        return self.fine_balance
     
\ No newline at end of file
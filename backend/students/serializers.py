@@ -1,27 +1,65 @@
 from rest_framework import serializers
 from .models import Students
+from issues.models import issues
+from backend.fast_serializers import RowSerializer
 
 class student_serializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='name')
     class_field = serializers.SerializerMethodField()
     books_to_return = serializers.SerializerMethodField()
     books_returned = serializers.SerializerMethodField()
+    # Only present when the queryset was annotated with it
+    books_overdue = serializers.IntegerField(read_only=True, required=False)
 
     class Meta:
         model = Students
-        fields = ['id','student_id', 'student_name', 'class_field', 'books_to_return', 'books_returned']
+        fields = ['id','student_id', 'student_name', 'class_field', 'books_to_return', 'books_returned', 'books_overdue']
 
     def get_class_field(self, obj):
-        return obj.student_id.split('-')[0] if obj.student_id else None
+        return obj.class_code
     
+    # Read from StudentsQuerySet.with_loan_stats() annotations; counted per
+    # student only when the queryset wasn't annotated
     def get_books_to_return(self, obj):
-        return None
+        if hasattr(obj, 'books_to_return'):
+            return obj.books_to_return
+        return issues.objects.filter(student=obj, return_date__isnull=True).count()
     
     
     def get_books_returned(self, obj):
-        return None
+        if hasattr(obj, 'books_returned'):
+            return obj.books_returned
+        return issues.objects.filter(student=obj, return_date__isnull=False).count()
 
     def to_representation(self, instance):
+        if not hasattr(instance, 'books_overdue'):
+            self.fields.pop('books_overdue', None)
         rep = super().to_representation(instance)
         rep['class'] = rep.pop('class_field')   # rename key in final output
         return rep
+
+
+class StudentRows(RowSerializer):
+    """student_serializer for read-only lists; see backend/fast_serializers.py."""
+    serializer_class = student_serializer
+    method_columns = {
+        "class_field": ("class_code",),
+        "books_to_return": ("books_to_return",),
+        "books_returned": ("books_returned",),
+    }
+    optional = ("books_overdue",)
+
+    def get_class_field(self, row):
+        return row["class_code"]
+
+    # Read from the with_loan_stats() annotations, which the queryset must have
+    def get_books_to_return(self, row):
+        return row["books_to_return"]
+
+    def get_books_returned(self, row):
+        return row["books_returned"]
+
+    def to_representation(self, row):
+        rep = super().to_representation(row)
+        rep['class'] = rep.pop('class_field')
+        return rep
@@ -1,3 +1,136 @@
-from django.test import TestCase
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+from books.models import Books
+from issues.models import issues
+from students.models import Students
+from students.serializers import StudentRows, student_serializer
 
-# Create your tests here.
+
+class StudentsPaginationTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Students.objects.bulk_create(
+            Students(student_id=f"IA25-{i:03d}", name=f"Student {i}") for i in range(25)
+        )
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/students/')
+        self.assertEqual(len(response.data), 25)
+
+    def test_cursor_walks_every_student_once(self):
+        seen = []
+        url = '/api/students/?page_size=10'
+        while url:
+            response = self.client.get(url)
+            seen.extend(row["student_id"] for row in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(seen, [f"IA25-{i:03d}" for i in range(25)])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/api/students/?page_size=1000000')
+        self.assertEqual(len(response.data["results"]), 25)
+        self.assertIsNone(response.data["next"])
+
+
+class AsyncStudentsListTests(APITestCase):
+    def setUp(self):
+        Students.objects.bulk_create(
+            Students(student_id=f"IA25-{i:03d}", name=f"Student {i}") for i in range(5)
+        )
+
+    def test_matches_sync_list(self):
+        response = async_to_sync(self.async_client.get)('/api/async/students/')
+        self.assertEqual(response.content, self.client.get('/api/students/').content)
+
+        response = async_to_sync(self.async_client.get)('/api/async/students/?page_size=2')
+        self.assertEqual(response.json()["results"], self.client.get('/api/students/?page_size=2').json()["results"])
+        self.assertIn('/api/async/students/?cursor=', response.json()["next"])
+
+
+class StudentLoanStatsTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.asha, self.ravi = Students.objects.bulk_create([
+            Students(student_id="IA25-001", name="Asha"),
+            Students(student_id="CS24-002", name="Ravi"),
+        ])
+        book = Books.objects.create(book_no="B001", title="Optics", quantity=10)
+        long_ago = timezone.now() - timedelta(days=30)
+        issues.objects.create(book=book, student=self.asha)
+        issues.objects.create(book=book, student=self.asha, time=long_ago)
+        issues.objects.create(book=book, student=self.asha, time=long_ago, return_date=timezone.localdate())
+        issues.objects.create(book=book, student=self.ravi, time=long_ago, return_date=timezone.localdate())
+
+    def test_directory_with_loan_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/students/')
+
+        rows = {row["student_id"]: row for row in response.data}
+        self.assertEqual((rows["IA25-001"]["books_to_return"], rows["IA25-001"]["books_returned"]), (2, 1))
+        self.assertEqual((rows["CS24-002"]["books_to_return"], rows["CS24-002"]["books_returned"]), (0, 1))
+        self.assertNotIn("books_overdue", rows["IA25-001"])
+
+    def test_optional_overdue_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/students/?overdue=1&page_size=10')
+
+        rows = {row["student_id"]: row for row in response.data["results"]}
+        self.assertEqual(rows["IA25-001"]["books_overdue"], 1)
+        self.assertEqual(rows["CS24-002"]["books_overdue"], 0)
+
+
+class StudentBatchTests(APITestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Students.objects.create(student_id="IA25-001", name="Asha")
+        Students.objects.bulk_create([
+            Students(student_id="CS24-002", name="Ravi"),
+            Students(student_id="guest", name="Guest"),
+        ])
+
+    def test_batch_and_class_are_stored(self):
+        self.assertEqual(
+            list(Students.objects.order_by('id').values_list('batch', 'class_code')),
+            [("25", "IA25"), ("24", "CS24"), (None, "guest")],
+        )
+        student = Students.objects.get(student_id="guest")
+        student.student_id = "EC23-010"
+        student.save(update_fields=['student_id'])
+        self.assertEqual(Students.objects.filter(batch="23", class_code="EC23").count(), 1)
+
+    def test_filter_by_batch_and_class(self):
+        response = self.client.get('/api/students/?batch=24')
+        self.assertEqual([row["student_id"] for row in response.data], ["CS24-002"])
+        self.assertEqual(response.data[0]["class"], "CS24")
+
+        response = self.client.get('/api/students/?class=IA25')
+        self.assertEqual([row["student_id"] for row in response.data], ["IA25-001"])
+
+
+class StudentRowsTests(APITestCase):
+    def setUp(self):
+        book = Books.objects.create(book_no="B001", title="Optics", quantity=5)
+        asha = Students.objects.create(student_id="IA25-001", name="Asha")
+        Students.objects.create(student_id="guest", name=None)
+        issues.objects.create(book=book, student=asha, due_date=timezone.now() - timedelta(days=1))
+        issues.objects.create(book=book, student=asha, return_date="2025-01-01")
+
+    def test_output_matches_student_serializer(self):
+        renderer = JSONRenderer()
+        for overdue in (False, True):
+            students = Students.objects.with_loan_stats(overdue=overdue).order_by('id')
+            rows = StudentRows()
+            self.assertEqual(
+                renderer.render(rows.serialize(rows.values(students))),
+                renderer.render(student_serializer(students, many=True).data),
+            )
+
+    def test_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/students/?overdue=1&page_size=1')
+        self.assertEqual(response.data["results"][0]["books_overdue"], 1)
+        self.assertEqual(self.client.get(response.data["next"]).data["results"][0]["class"], "guest")
@@ -1,12 +1,26 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from .serializers import student_serializer
+from .serializers import StudentRows
 from rest_framework.views import APIView
 from django.views.decorators.csrf import csrf_exempt
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.http import HttpResponse
 from .models import Students
+from backend.pagination import KeysetPagination
+from backend.async_api import apaginate, render_json
+
+
+def _students_queryset(params):
+    # ?overdue=1 adds books_overdue to every row
+    overdue = params.get('overdue', '').lower() in ('1', 'true', 'yes')
+    students = Students.objects.with_loan_stats(overdue=overdue).order_by('id')
+    # ?batch=25 / ?class=IA25 filter on the stored, indexed columns
+    if params.get('batch'):
+        students = students.filter(batch=params['batch'])
+    if params.get('class'):
+        students = students.filter(class_code=params['class'])
+    return students
 
 
 # Create your views here.
@@ -14,10 +28,25 @@ class studentsViews(APIView):
     permission_classes = [AllowAny]
 
     def get(self , request):
-        print("Self:", self)
-        print("Request : ", request)
-        
-        serializer = student_serializer(Students.objects.all() ,many=True)
-        for i in serializer.data:
-            print(i)
-        return Response(serializer.data)
+        # Rendered from .values() rows, the same output as student_serializer
+        rows = StudentRows()
+        students = rows.values(_students_queryset(request.query_params))
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(students, request, view=self)
+        if page is not None:
+            return paginator.get_paginated_response(rows.serialize(page))
+
+        return Response(rows.serialize(students))
+
+
+# Async variant of the list, served under /api/async/ (see backend/async_api.py)
+async def students_list_async(request):
+    rows = StudentRows()
+    students = rows.values(_students_queryset(request.GET))
+    paginator = KeysetPagination()
+    page = await apaginate(paginator, students, request)
+    if page is not None:
+        return render_json(paginator.get_paginated_response(rows.serialize(page)).data)
+
+    students = [student async for student in students]
+    return render_json(rows.serialize(students))